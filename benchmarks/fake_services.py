@@ -0,0 +1,292 @@
+"""
+Local stand-ins for TMDB and YouTube, so the bot can be benchmarked offline.
+
+- start_tmdb_server() serves the JSON fixtures in fixtures/tmdb over HTTP,
+  on the paths the bot uses: /3/movie/<id> (with append_to_response) and
+  /3/movie/<id>/videos|credits|release_dates.
+- start_media_server() serves deterministic byte streams for every format
+  of every fake video.
+- make_fake_yt_dlp() builds a drop-in `yt_dlp` module. Its YoutubeDL
+  subclasses the real one and only replaces page extraction: search results
+  and info dicts are canned, so format selection, progress hooks, rate
+  limits and the HTTP downloader are the real yt-dlp code paths.
+
+Benchmarks need more movies than there are fixtures, so IDs above
+SYNTHETIC_STRIDE are derived from a fixture: movie 10000155 is "The Dark
+Knight 2", with its own full-movie video on YouTube.
+"""
+import os
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tmdb")
+SYNTHETIC_STRIDE = 10 ** 7  # movie_id = sequel * stride + fixture_id
+APPENDABLE = ('videos', 'credits', 'release_dates')
+CHUNK = bytes(range(256)) * 256  # 64 KiB of media payload, repeated
+
+def load_fixtures():
+    """TMDB payloads by movie ID, as TMDB returns them with videos, credits and release_dates appended"""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if name.endswith('.json'):
+            with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+                payload = json.load(f)
+            fixtures[payload['id']] = payload
+    return fixtures
+
+FIXTURES = load_fixtures()
+
+def benchmark_movie_ids(count):
+    """`count` distinct movie IDs: the fixtures first, then their synthetic sequels"""
+    base_ids = sorted(FIXTURES)
+    return [(i // len(base_ids)) * SYNTHETIC_STRIDE + base_ids[i % len(base_ids)] for i in range(count)]
+
+def tmdb_payload(movie_id):
+    """TMDB payload for a fixture or synthetic movie ID, or None when unknown"""
+    sequel, base_id = divmod(int(movie_id), SYNTHETIC_STRIDE)
+    if base_id not in FIXTURES:
+        return None
+    payload = json.loads(json.dumps(FIXTURES[base_id]))
+    if sequel:
+        payload['id'] = int(movie_id)
+        payload['title'] = f"{payload['title']} {sequel + 1}"
+        payload['original_title'] = f"{payload['original_title']} {sequel + 1}"
+        for video in payload['videos']['results']:
+            video['key'] = f"{video['key'][0]}{int(movie_id):010d}"
+    return payload
+
+class FakeTMDBHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API behind the bot's pooled session
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = re.fullmatch(r'/3/movie/(\d+)(?:/(\w+))?', url.path)
+        payload = tmdb_payload(match.group(1)) if match else None
+        if payload is None or (match.group(2) and match.group(2) not in APPENDABLE):
+            return self.send_json(404, {'success': False, 'status_code': 34, 'status_message': 'The resource you requested could not be found.'})
+
+        time.sleep(self.server.latency)
+        if match.group(2):
+            return self.send_json(200, payload[match.group(2)])
+
+        requested = parse_qs(url.query).get('append_to_response', [''])[0].split(',')
+        body = {key: value for key, value in payload.items() if key not in APPENDABLE or key in requested}
+        etag = f'"{payload["id"]}-{",".join(sorted(requested))}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json(200, body, etag)
+
+    def send_json(self, status, body, etag=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith('/subs/'):
+            data = b"WEBVTT\n\n00:00:01.000 --> 00:00:03.000\nOffline benchmark subtitle\n"
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/vtt')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        match = re.fullmatch(r'/media/(\w+)/(\w+)', path)
+        if not match:
+            self.send_error(404)
+            return
+        size = format_size(match.group(2), self.server.media_bytes)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        try:
+            while size > 0:
+                chunk = CHUNK[:min(size, len(CHUNK))]
+                self.wfile.write(chunk)
+                size -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def start_server(handler, **attributes):
+    """Start a threaded HTTP server on a free local port; returns (server, base URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def start_tmdb_server(latency=0.02):
+    """Fake TMDB API; `latency` seconds are added to every answer to model the network"""
+    server, base_url = start_server(FakeTMDBHandler, latency=latency)
+    return server, f"{base_url}/3"
+
+def start_media_server(media_bytes):
+    """Media server; the video stream of every fake video is `media_bytes` long"""
+    return start_server(MediaHandler, media_bytes=media_bytes)
+
+def format_size(format_id, media_bytes):
+    """Bytes served for a format: full size for video, an eighth for audio"""
+    return media_bytes if format_id == '137' else max(1, media_bytes // 8)
+
+# Fake YouTube catalogue. Video IDs are 11 characters and encode what they are:
+# F<movie> full movie, T<movie> trailer, B<movie> behind the scenes, R<movie> review, Z<n> filler
+def catalog_movie(movie_id):
+    payload = tmdb_payload(movie_id)
+    return {
+        'title': payload['title'],
+        'original_title': payload['original_title'],
+        'year': payload['release_date'][:4],
+        'runtime': payload['runtime'] * 60
+    }
+
+def video_entry(video_id):
+    """Flat search entry (id, url, title, duration) for a fake video ID"""
+    kind, number = video_id[0], int(video_id[1:])
+    if kind == 'Z':
+        title, duration = f"Relaxing music for studying #{number}", 3600 + number
+    else:
+        movie = catalog_movie(number)
+        title, duration = {
+            'F': (f"{movie['title']} ({movie['year']}) Full Movie HD", movie['runtime'] + 17),
+            'T': (f"{movie['title']} - Official Trailer", 150),
+            'B': (f"{movie['title']} - Behind the Scenes", 480),
+            'R': (f"{movie['title']} review: is it worth watching?", 720),
+        }[kind]
+    return {
+        '_type': 'url',
+        'ie_key': 'Youtube',
+        'id': video_id,
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'title': title,
+        'duration': duration
+    }
+
+def search_entries(query, count):
+    """Canned results for a search: the matching movie's videos first, then fillers"""
+    movie_ids = [int(movie_id) for movie_id in sorted(FIXTURES)]
+    known = sorted(
+        {movie_id for movie_id in _searchable if _query_mentions(query, movie_id)},
+        key=lambda movie_id: -len(catalog_movie(movie_id)['title'])
+    )
+    entries = []
+    if known:
+        movie_id = known[0]
+        base_id = movie_id % SYNTHETIC_STRIDE
+        other = movie_ids[(movie_ids.index(base_id) + 1) % len(movie_ids)]
+        entries = [video_entry(f"{kind}{movie_id:010d}") for kind in 'TRFB'] + [video_entry(f"F{other:010d}")]
+    entries += [video_entry(f"Z{n:010d}") for n in range(count - len(entries))]
+    return entries[:count]
+
+_searchable = set(FIXTURES)  # Movies that have videos on the fake YouTube
+
+def register_movies(movie_ids):
+    """Make synthetic movies findable by search (fixtures always are)"""
+    _searchable.update(int(movie_id) for movie_id in movie_ids)
+
+def _query_mentions(query, movie_id):
+    movie = catalog_movie(movie_id)
+    return any(
+        re.search(rf"(?<!\w){re.escape(title.lower())}(?!\w)", query.lower())
+        for title in (movie['title'], movie['original_title'])
+    )
+
+def video_info(video_id, media_url):
+    """Full info dict, shaped like yt-dlp's YouTube extractor output, for a fake video"""
+    entry = video_entry(video_id)
+    watch_url = entry['url']
+    media = f"{media_url}/media/{video_id}"
+    return {
+        'id': video_id,
+        'title': entry['title'],
+        'duration': entry['duration'],
+        'extractor': 'youtube',
+        'extractor_key': 'Youtube',
+        'webpage_url': watch_url,
+        'original_url': watch_url,
+        'webpage_url_basename': 'watch',
+        'webpage_url_domain': 'youtube.com',
+        'formats': [
+            {'format_id': '137', 'url': f"{media}/137", 'ext': 'mp4', 'protocol': 'http', 'vcodec': 'avc1.640028', 'acodec': 'none',
+             'height': 1080, 'width': 1920, 'tbr': 4500},
+            {'format_id': '140', 'url': f"{media}/140", 'ext': 'm4a', 'protocol': 'http', 'vcodec': 'none', 'acodec': 'mp4a.40.2',
+             'language': 'en', 'tbr': 129},
+            {'format_id': '139', 'url': f"{media}/139", 'ext': 'm4a', 'protocol': 'http', 'vcodec': 'none', 'acodec': 'mp4a.40.5',
+             'language': 'fr', 'tbr': 49},
+        ],
+        'subtitles': {lang: [{'ext': 'vtt', 'url': f"{media_url}/subs/{video_id}.{lang}.vtt"}] for lang in ('en', 'fr')},
+        'automatic_captions': {}
+    }
+
+def make_fake_yt_dlp(media_url, media_bytes, extract_latency=0.3, search_latency=0.5):
+    """
+    A stand-in for the `yt_dlp` module (pass it to the bot through
+    `load_yt_dlp`). Page extraction and searches sleep for the given
+    latencies and return canned data; everything after extraction is the
+    real yt-dlp.
+    """
+    import types
+    import yt_dlp
+
+    class FakeYoutubeDL(yt_dlp.YoutubeDL):
+        def extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True, force_generic_extractor=False):
+            search = re.fullmatch(r'ytsearch(\d*):(.*)', url, re.DOTALL)
+            if not search and not re.match(r'https?://', url):
+                search = re.fullmatch(r'ytsearch(\d*)', self.params.get('default_search') or 'ytsearch')
+                search = (search.group(1), url) if search else None
+            else:
+                search = search.groups() if search else None
+
+            if search:
+                count, query = int(search[0] or 1), search[1]
+                time.sleep(search_latency)
+                info = {
+                    '_type': 'playlist',
+                    'id': query,
+                    'title': query,
+                    'extractor': 'youtube:search',
+                    'extractor_key': 'YoutubeSearch',
+                    'webpage_url': f"ytsearch{count}:{query}",
+                    'entries': search_entries(query, count)
+                }
+            else:
+                video_id = parse_qs(urlparse(url).query).get('v', [''])[0]
+                if not re.fullmatch(r'[FTBRZ]\d{10}', video_id):
+                    raise yt_dlp.DownloadError(f"ERROR: [youtube] {video_id or url}: Video unavailable")
+                time.sleep(extract_latency)
+                info = video_info(video_id, media_url)
+                for fmt in info['formats']:
+                    fmt['filesize'] = format_size(fmt['format_id'], media_bytes)
+
+            if not process:
+                return info
+            return self.process_ie_result(info, download=download, extra_info=extra_info)
+
+    module = types.ModuleType('yt_dlp')
+    module.YoutubeDL = FakeYoutubeDL
+    module.DownloadError = yt_dlp.DownloadError
+    return module
@@ -0,0 +1,72 @@
+"""
+Import-time regression check for youtube_downloader.
+
+Imports the script in a fresh interpreter with `python -X importtime`,
+prints the slowest imports and exits with status 1 when a heavy dependency
+(yt-dlp, requests) is imported eagerly again or when the module's own
+cumulative import time goes over budget.
+
+    python benchmarks/import_time.py [--budget-ms 60] [--runs 5]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "youtube_downloader"
+LAZY_MODULES = ('yt_dlp', 'requests', 'urllib3', 'http.server', 'cProfile', 'tracemalloc')  # Must only load on first use
+
+def import_profile():
+    """Import the module once with -X importtime; returns {module: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {MODULE}"],
+        cwd=REPO_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ Importing {MODULE} failed:\n{result.stderr}")
+    
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+def help_wall_time():
+    """Wall time of `youtube_downloader.py --help`, the cheapest possible CLI run"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, f"{MODULE}.py", '--help'], cwd=REPO_DIR, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Import-time benchmark for {MODULE}")
+    parser.add_argument("--budget-ms", type=float, default=60, help="Max cumulative import time of the module (default: 60 ms)")
+    parser.add_argument("--runs", type=int, default=5, help="Imports to run; the fastest one is reported (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list (default: 10)")
+    args = parser.parse_args()
+    
+    profiles = [import_profile() for _ in range(args.runs)]
+    best = min(profiles, key=lambda profile: profile[MODULE][1])
+    cumulative_ms = best[MODULE][1] / 1000
+    
+    print(f"⏱️ {MODULE} import: {cumulative_ms:.1f} ms cumulative (best of {args.runs}), budget {args.budget_ms:.0f} ms")
+    print(f"\n🐢 Slowest imports:")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: item[1][1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:7.1f} ms  {name.strip()}")
+    print(f"\n⏱️ --help wall time: {help_wall_time() * 1000:.0f} ms")
+    
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in best]
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if cumulative_ms > args.budget_ms:
+        failures.append(f"import took {cumulative_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Import time OK")
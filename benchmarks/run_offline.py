@@ -0,0 +1,156 @@
+"""
+Offline throughput benchmark: process_movie against local TMDB and YouTube stand-ins.
+
+For each concurrency level, a fresh Python process (cold caches, its own
+working directory, its own peak RSS) runs `process_movie` for the same set
+of movies on a thread pool of that size. TMDB answers come from
+fixtures/tmdb through a local HTTP server. Searches and page extractions
+are canned with a configurable latency, and the media bytes are real HTTP
+transfers from a local server (see fake_services.py). Reported per level:
+movies/minute, p50/p90 latency of every timed stage, and peak RSS.
+
+    python benchmarks/run_offline.py --movies 24 --concurrency 1,2,4,8
+    python benchmarks/run_offline.py --json results.json --media-mb 32
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path[:0] = [BENCHMARK_DIR, REPO_DIR]
+
+import fake_services
+
+STAGES = ('tmdb', 'search', 'search_listing', 'extract', 'download')
+
+def run_level(args):
+    """Child process: benchmark one concurrency level and print the result as one JSON line"""
+    os.chdir(args.workdir)  # The bot keeps its downloads and caches relative to the working directory
+    import youtube_downloader as bot
+
+    bot.TMDB_API_KEY = 'offline-benchmark'
+    bot.TMDB_BASE_URL = args.tmdb_url
+    bot.RATE_LIMITS['tmdb']['rate'] = args.tmdb_rate
+    bot.RATE_LIMITS['youtube']['rate'] = args.youtube_rate
+    bot.RATE_LIMITS['youtube']['burst'] = max(bot.RATE_LIMITS['youtube']['burst'], args.concurrency)
+    bot.SEARCH_MODE = args.search_mode
+    bot.DISK_HEADROOM = 0
+    bot.METRICS_WINDOW = None  # Keep every stage sample: percentiles over the whole level
+    fake_yt_dlp = fake_services.make_fake_yt_dlp(args.media_url, args.media_bytes, args.extract_latency, args.search_latency)
+    bot.load_yt_dlp = lambda: fake_yt_dlp
+
+    movie_ids = fake_services.benchmark_movie_ids(args.movies)
+    fake_services.register_movies(movie_ids)
+
+    sys.stdout = open(os.devnull, 'w')  # The bot narrates every step
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(lambda movie_id: bot.process_movie(movie_id, args.lang, args.mode), movie_ids))
+    elapsed = time.perf_counter() - started
+    sys.stdout = sys.__stdout__
+
+    result = {
+        'concurrency': args.concurrency,
+        'movies': len(movie_ids),
+        'succeeded': sum(1 for ok in outcomes if ok),
+        'elapsed': round(elapsed, 3),
+        'movies_per_minute': round(len(movie_ids) / elapsed * 60, 2),
+        'download_bytes': bot.METRICS['download_bytes'],
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        'stages': {
+            stage: {
+                'count': len(samples),
+                'p50': round(bot.percentile(samples, 50), 4),
+                'p90': round(bot.percentile(samples, 90), 4),
+                'p99': round(bot.percentile(samples, 99), 4)
+            }
+            for stage, samples in sorted(bot.METRICS['stages'].items()) if samples
+        }
+    }
+    print(json.dumps(result))
+
+def print_table(results):
+    stages = [stage for stage in STAGES if any(stage in r['stages'] for r in results)]
+    header = f"{'workers':>7} {'movies/min':>10} {'ok':>7} {'peak RSS':>9}" + "".join(f" {stage + ' p50/p90':>22}" for stage in stages)
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = f"{r['concurrency']:>7} {r['movies_per_minute']:>10.1f} {r['succeeded']:>3}/{r['movies']:<3} {r['peak_rss_mb']:>6.1f} MB"
+        for stage in stages:
+            timing = r['stages'].get(stage)
+            cell = f"{timing['p50']:.3f}s / {timing['p90']:.3f}s" if timing else '-'
+            line += f" {cell:>22}"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of process_movie with local TMDB/YouTube stand-ins")
+    parser.add_argument("--movies", type=int, default=24, help="Movies processed per concurrency level (default: 24)")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated thread counts to compare (default: 1,2,4,8)")
+    parser.add_argument("--mode", choices=['separate', 'merged', 'both', 'remux', 'check'], default='separate',
+                        help="Download mode; merged and remux need ffmpeg (default: separate)")
+    parser.add_argument("--lang", default="fr", help="Preferred language (default: fr)")
+    parser.add_argument("--search-mode", choices=['two-phase', 'full'], default='two-phase', help="Search strategy (default: two-phase)")
+    parser.add_argument("--media-mb", type=float, default=8, help="Size of each fake video stream in MiB; audio is 1/8 of it (default: 8)")
+    parser.add_argument("--tmdb-latency", type=float, default=0.05, help="Seconds added to every fake TMDB answer (default: 0.05)")
+    parser.add_argument("--extract-latency", type=float, default=0.3, help="Seconds per fake YouTube page extraction (default: 0.3)")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="Seconds per fake YouTube search (default: 0.5)")
+    parser.add_argument("--tmdb-rate", type=float, default=1000, help="Bot's TMDB rate limit, requests/s (default: 1000, effectively off)")
+    parser.add_argument("--youtube-rate", type=float, default=1000, help="Bot's YouTube rate limit, calls/s (default: 1000, effectively off)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results to FILE")
+    parser.add_argument("--keep", action="store_true", help="Keep each level's working directory (downloads, caches)")
+    # Set by the parent for its child processes
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--tmdb-url", help=argparse.SUPPRESS)
+    parser.add_argument("--media-url", help=argparse.SUPPRESS)
+    parser.add_argument("--media-bytes", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.workdir:
+        args.concurrency = int(args.concurrency)
+        run_level(args)
+        sys.exit(0)
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    media_bytes = int(args.media_mb * 1024 * 1024)
+    _, tmdb_url = fake_services.start_tmdb_server(args.tmdb_latency)
+    _, media_url = fake_services.start_media_server(media_bytes)
+    print(f"🧪 {args.movies} movies per level, {args.mode} mode, {args.media_mb:g} MiB video streams, fake TMDB at {tmdb_url}")
+
+    passthrough = [
+        '--movies', str(args.movies), '--mode', args.mode, '--lang', args.lang, '--search-mode', args.search_mode,
+        '--extract-latency', str(args.extract_latency), '--search-latency', str(args.search_latency),
+        '--tmdb-rate', str(args.tmdb_rate), '--youtube-rate', str(args.youtube_rate),
+        '--tmdb-url', tmdb_url, '--media-url', media_url, '--media-bytes', str(media_bytes)
+    ]
+    results = []
+    for level in levels:
+        workdir = tempfile.mkdtemp(prefix=f"ytbot-bench-{level}-")
+        try:
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--concurrency', str(level), '--workdir', workdir, *passthrough],
+                capture_output=True, text=True
+            )
+            if child.returncode != 0:
+                sys.exit(f"❌ Level {level} failed:\n{child.stderr}")
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+            print(f"  ✅ {level} worker(s): {results[-1]['movies_per_minute']:.1f} movies/min")
+        finally:
+            if args.keep:
+                print(f"  📁 Kept {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+        print(f"\n📄 Results written to: {args.json}")
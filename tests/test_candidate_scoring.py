@@ -0,0 +1,68 @@
+"""
+score_candidates (trigram scorer) must rank search results like the
+reference calculate_match_score (SequenceMatcher) does.
+"""
+import os
+import sys
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import youtube_downloader as bot
+
+MOVIES = {
+    'dark_knight': {'title': 'The Dark Knight', 'original_title': 'The Dark Knight', 'year': '2008', 'runtime': 152},
+    'amelie': {'title': 'Amélie', 'original_title': "Le Fabuleux Destin d'Amélie Poulain", 'year': '2001', 'runtime': 122},
+    'leon': {'title': 'Léon: The Professional', 'original_title': 'Léon', 'year': '1994', 'runtime': 110},
+}
+
+CANDIDATES = {
+    'dark_knight': [
+        {'title': 'The Dark Knight (2008) Full Movie', 'duration': 152 * 60},
+        {'title': 'The Dark Knight', 'duration': 150 * 60},
+        {'title': 'The Dark Knight Rises (2012) Full Movie', 'duration': 164 * 60},
+        {'title': 'The Dark Knight - Official Trailer', 'duration': 150},
+        {'title': 'Batman Begins Full Movie', 'duration': 140 * 60},
+        {'title': 'Joker interrogation scene 4K', 'duration': 300},
+        {'title': 'Top 10 Batman moments', 'duration': 900},
+    ],
+    'amelie': [
+        {'title': "Le Fabuleux Destin d'Amélie Poulain (2001) film complet", 'duration': 122 * 60},
+        {'title': 'Amélie 2001 full movie', 'duration': 121 * 60},
+        {'title': 'Amélie - Bande annonce', 'duration': 120},
+        {'title': 'Yann Tiersen - Comptine d un autre été', 'duration': 140},
+        {'title': 'Paris travel vlog', 'duration': 1200},
+    ],
+    'leon': [
+        {'title': 'Léon: The Professional (1994) Full Movie', 'duration': 110 * 60, 'is_tmdb_official': True},
+        {'title': 'Leon The Professional full movie', 'duration': 133 * 60},
+        {'title': 'Léon trailer', 'duration': 130},
+        {'title': 'Natalie Portman interview', 'duration': 600},
+    ],
+}
+
+# Pairs closer than this under the reference scorer may legitimately swap
+MARGIN = 0.05
+
+def reference_scores(movie_key):
+    return [bot.calculate_match_score(candidate, MOVIES[movie_key]) for candidate in CANDIDATES[movie_key]]
+
+def test_top_candidate_matches_reference():
+    for movie_key, candidates in CANDIDATES.items():
+        reference = reference_scores(movie_key)
+        fast = bot.score_candidates(candidates, MOVIES[movie_key])
+        assert fast.index(max(fast)) == reference.index(max(reference)), movie_key
+
+def test_pairwise_order_matches_reference():
+    for movie_key, candidates in CANDIDATES.items():
+        reference = reference_scores(movie_key)
+        fast = bot.score_candidates(candidates, MOVIES[movie_key])
+        for i, j in combinations(range(len(candidates)), 2):
+            if abs(reference[i] - reference[j]) < MARGIN:
+                continue
+            assert (reference[i] > reference[j]) == (fast[i] > fast[j]), (movie_key, candidates[i]['title'], candidates[j]['title'])
+
+def test_malformed_entries_score_none():
+    scores = bot.score_candidates([{'title': 'The Dark Knight'}, {'title': 'x', 'duration': 'unknown'}], MOVIES['dark_knight'])
+    assert scores[0] is not None
+    assert scores[1] is None
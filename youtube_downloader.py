@@ -2,11 +2,25 @@ import os
 import re
 import sys
 import time
+import csv
+import json
+import math
+import queue
 import argparse
-from yt_dlp import YoutubeDL, DownloadError
-import requests
-from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import copy
+import heapq
+import hashlib
+import itertools
+import shutil
+import socket
+import sqlite3
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from difflib import SequenceMatcher
 
 # Constants
@@ -14,6 +28,151 @@ TMDB_API_KEY = "your_tmdb_api_key" # Replace with your/company's TMDB API Read A
 TMDB_BASE_URL = 'https://api.themoviedb.org/3'
 YOUTUBE_SEARCH_TEMPLATE = "{} {} full movie"  # Template for YouTube search query
 MAX_DURATION_DIFF = 3 * 60  # Maximum duration difference in seconds (+/- 3 minutes)
+BASE_DIR = "Youtube_Bot_Downloads"  # Root folder for all downloads
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")  # Caches, journal and other bot state
+
+# Job journal (batch mode): records each movie's progress so a restarted worker resumes
+JOURNAL_FILE = None  # SQLite path, enabled with --journal
+JOURNAL_OWNER = f"{socket.gethostname()}:{os.getpid()}"  # Identifies this worker in the journal
+JOURNAL_LEASE = 6 * 60 * 60  # Seconds before a job held by an unreachable worker can be taken over
+JOURNAL_MAX_ATTEMPTS = 5  # Failed movies are retried on later runs up to this many attempts
+JOURNAL_BACKOFF_BASE = 5 * 60  # First retry delay in seconds, doubled after each failure
+JOURNAL_BACKOFF_MAX = 24 * 60 * 60  # Longest retry delay in seconds
+
+# Downloads
+STREAM_WORKERS = 3  # Video, audio and subtitles downloaded in parallel in separate/both modes
+FRAGMENT_WORKERS = 4  # yt-dlp concurrent_fragment_downloads for DASH/HLS streams
+
+# Content-addressed store: each (video ID, format) is downloaded once, movie folders link to it
+STORE_ENABLED = True  # Set to False (--no-store) to always download into the movie folder
+STORE_DIR = os.path.join(BASE_DIR, ".store")  # Blobs, kept on the same filesystem as the movie folders for hardlinks
+STORE_INDEX_FILE = os.path.join(CACHE_DIR, "store.sqlite3")
+STORE_ORPHAN_GRACE = 60 * 60  # Seconds before an unindexed file in the store is garbage (may be mid-ingest)
+
+# Download scheduler: one bandwidth budget and disk admission for all concurrent downloads
+BANDWIDTH_LIMIT = None  # Bytes/sec shared by all running downloads (--max-bandwidth), None for no cap
+PRIORITY_WEIGHTS = {'high': 4, 'normal': 2, 'low': 1}  # Bandwidth share and admission order of each priority class
+DISK_HEADROOM = 1024 ** 3  # Bytes always left free on the download disk
+ADMISSION_POLL = 5  # Seconds between free-space checks while a job waits for room
+
+# Match decisions: TMDB ID -> chosen YouTube URL, reused instead of searching again
+DECISION_CACHE_ENABLED = True  # Set to False (--no-decision-cache) to always search
+DECISION_CACHE_FILE = os.path.join(CACHE_DIR, "decisions.sqlite3")
+DECISION_MIN_SCORE = 0.75  # Only decisions at least this confident are stored and reused
+
+# YouTube search
+SEARCH_MODE = 'two-phase'  # 'two-phase' (flat listing, verify top-K) or 'full' (resolve every result)
+SEARCH_CANDIDATES = 20  # Results requested from YouTube search
+SEARCH_TOP_K = 3  # Candidates fully extracted for verification in two-phase mode
+SEARCH_QUERY_VARIANTS = ('title_year', 'original_year', 'title_director', 'localized')  # Queries run concurrently in two-phase mode
+SEARCH_HIGH_CONFIDENCE = 0.8  # Stop waiting for other query variants once a candidate scores this high
+LOCALIZED_FULL_MOVIE = {  # "full movie" in the --lang language, for the 'localized' query variant
+    'fr': 'film complet',
+    'es': 'película completa',
+    'it': 'film completo',
+    'pt': 'filme completo',
+    'de': 'ganzer film',
+    'nl': 'volledige film',
+    'tr': 'tek parça film',
+    'ru': 'фильм полностью',
+}
+
+# TMDB fetch layer
+TMDB_APPEND = ('videos', 'credits', 'release_dates')  # Sub-resources fetched along with /movie/{id}
+TMDB_USE_APPEND = True  # Use append_to_response (one request); False = concurrent per-resource requests
+TMDB_TIMEOUT = 30  # Seconds per TMDB request
+HTTP_POOL_SIZE = 32  # Max keep-alive connections kept per host
+
+# Rate limits shared by every worker thread (and every process with --rate-limit-db)
+RATE_LIMITS = {
+    'tmdb': {'rate': 20.0, 'burst': 20},  # Requests per second to the TMDB API
+    'youtube': {'rate': 1.0, 'burst': 4},  # yt-dlp extractions/searches per second
+}
+RATE_LIMIT_FILE = None  # SQLite path to share buckets between processes
+RATE_LIMIT_MIN_FACTOR = 0.05  # Throttling never slows a bucket below this fraction of its rate
+RATE_LIMIT_RECOVERY = 0.05  # Fraction of the configured rate regained after each success
+TMDB_THROTTLE_RETRIES = 3  # Retries of a TMDB request answered with 429
+
+# On-disk caches
+TMDB_CACHE_FILE = os.path.join(CACHE_DIR, "tmdb.sqlite3")
+TMDB_CACHE_ENABLED = True  # Set to False (--no-cache) to always hit TMDB
+TMDB_CACHE_TTL = 24 * 60 * 60  # Seconds before a cached entry gets revalidated
+TMDB_CACHE_MAX_ENTRIES = 20000  # Least recently used entries beyond this are evicted
+
+# TMDB catalogue ingestion (--ingest discover|list|changes)
+CATALOGUE_FILE = os.path.join(CACHE_DIR, "catalogue.sqlite3")  # Page cursors and movies already offered
+CATALOGUE_MAX_PAGES = 500  # TMDB never serves pages beyond this
+CHANGES_WINDOW_DAYS = 14  # Longest date range TMDB accepts for /movie/changes
+
+# yt-dlp extraction cache: one extract_info per video feeds check, selection and all downloads
+EXTRACTION_CACHE_TTL = 30 * 60  # Seconds an info dict is reused (stream URLs expire after a few hours)
+EXTRACTION_CACHE_MAX_ENTRIES = 64  # Info dicts kept in memory
+EXTRACTION_CACHE_PERSIST = False  # Also keep info dicts on disk for the next run (--persist-extractions)
+EXTRACTION_CACHE_FILE = os.path.join(CACHE_DIR, "extractions.sqlite3")
+
+# Batch pipeline defaults (one worker pool per stage)
+METADATA_WORKERS = 8  # Concurrent TMDB lookups
+SEARCH_WORKERS = 4  # Concurrent YouTube searches
+DOWNLOAD_WORKERS = 2  # Concurrent downloads (bandwidth-bound, keep low)
+STAGE_QUEUE_SIZE = 16  # Max items waiting between two stages (backpressure)
+BATCH_RESULTS_FILE = os.path.join(BASE_DIR, "batch_results.jsonl")
+
+# Bulk language audit (--audit)
+AUDIT_WORKERS = 8  # Concurrent probes
+AUDIT_OUTPUT_FILE = os.path.join(BASE_DIR, "language_audit.jsonl")  # '.csv' extension switches to CSV
+AUDIT_COLUMNS = ('input', 'url', 'title', 'audio_langs', 'manual_subs', 'auto_subs', 'best_height', 'error')
+
+# Service mode (--serve): long-running HTTP job API sharing caches and sessions across jobs
+SERVICE_HOST = '127.0.0.1'  # Listen address (--host); use 0.0.0.0 to accept other machines
+SERVICE_PORT = 8080
+SERVICE_JOBS_KEPT = 1000  # Finished jobs still answered by GET /jobs/<id>, oldest forgotten first
+SERVICE_EVENTS_KEPT = 200  # Latest events replayed to a new /events subscriber
+SERVICE_MAX_BODY = 1024 * 1024  # Largest accepted request body, in bytes
+
+# Instrumentation
+TRACE_FILE = None  # JSONL file receiving one event per timed stage (--trace-file)
+METRICS_FILE = None  # Prometheus text-format file written at the end of a run (--metrics-file)
+
+_http_session = None  # Shared requests.Session, see get_http_session()
+_http_session_lock = threading.Lock()
+
+_rate_limit_buckets = {}  # Bucket name -> token bucket state (in-process backend)
+_rate_limit_lock = threading.Lock()
+RATE_LIMIT_STATS = {name: {'requests': 0, 'waiting': 0.0, 'working': 0.0, 'throttled': 0} for name in RATE_LIMITS}
+
+_metrics_lock = threading.Lock()
+_trace_context = threading.local()  # movie_id of the work running in this thread
+METRICS_WINDOW = 1000  # Latest samples kept per stage for the quantiles; sums and counts cover the whole run
+METRICS = {  # Stage durations, bytes received, transfer rates
+    'stages': {},  # Stage -> deque of its latest durations
+    'stage_totals': {},  # Stage -> [sum of durations, count]
+    'download_bytes': 0,
+    'throughput': deque(maxlen=METRICS_WINDOW),
+    'throughput_total': [0.0, 0]
+}
+
+_scheduler_cond = threading.Condition()  # Guards _download_jobs; notified whenever a job starts or ends
+_download_jobs = {'waiting': [], 'active': []}  # Download jobs waiting for admission / running
+_job_sequence = itertools.count()  # Arrival order among jobs of the same priority
+
+PROGRESS_LISTENERS = []  # Callables (movie_id, event) told about download progress, e.g. by service mode
+PROGRESS_INTERVAL = 1.0  # Min seconds between two 'downloading' events for the same file
+
+_journal_claims = set()  # Movie IDs this process currently holds a journal lease on
+
+_extraction_cache = OrderedDict()  # URL -> (extracted_at, sanitized info dict)
+_extraction_lock = threading.Lock()
+EXTRACTION_STATS = {'extractions': 0, 'reused': 0}
+
+def load_yt_dlp():
+    """Import yt-dlp on first use: it takes a noticeable part of a second, which --help, check runs and TMDB-only work never need"""
+    import yt_dlp
+    return yt_dlp
+
+def load_requests():
+    """Import requests on first use (not needed for --help, cache-only runs or argument errors)"""
+    import requests
+    return requests
 
 def spinner():
     """Show a simple spinner animation for loading states"""
@@ -40,71 +199,849 @@ def print_formats(formats):
         resolution = f"{f.get('height', '-')}p" if f.get('height') else '-'
         print(f"  ID: {f.get('format_id'):<7} | ext: {f.get('ext', '-'):<5} | lang: {lang:<5} | res: {resolution:<6} | note: {f.get('format_note', '-'):<15}")
 
-def get_tmdb_movie_details(movie_id):
-    """Fetch movie details from TMDB API"""
+def set_trace_movie(movie_id):
+    """Tag the metrics and trace events recorded by this thread with a movie ID"""
+    _trace_context.movie_id = movie_id
+
+def write_trace_event(event):
+    """Append one event to the JSONL trace file"""
+    with _metrics_lock:
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+
+@contextmanager
+def timed(stage, **labels):
+    """
+    Time one pipeline stage (tmdb, search, search_listing, extract, download).
+
+    The duration feeds the per-stage metrics and, with TRACE_FILE set, is
+    written as a JSONL trace event with the current movie ID and `labels`.
+    Works as a context manager or as a function decorator.
+    """
+    started = time.time()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        duration = time.time() - started
+        with _metrics_lock:
+            METRICS['stages'].setdefault(stage, deque(maxlen=METRICS_WINDOW)).append(duration)
+            totals = METRICS['stage_totals'].setdefault(stage, [0.0, 0])
+            totals[0] += duration
+            totals[1] += 1
+        if TRACE_FILE:
+            write_trace_event({
+                'ts': round(started, 3),
+                'stage': stage,
+                'duration': round(duration, 4),
+                'ok': ok,
+                'movie_id': getattr(_trace_context, 'movie_id', None),
+                'thread': threading.current_thread().name,
+                **labels
+            })
+
+def make_progress_hook(label, job=None):
+    """
+    Build a yt-dlp progress hook that counts downloaded bytes and records
+    throughput per finished file. Bytes are also credited to the scheduler
+    `job`, if any, so its disk reservation shrinks as the file grows, and
+    PROGRESS_LISTENERS get a throttled progress event.
+    """
+    last_bytes = {}
+    last_event = {}
+    
+    def notify_progress(d):
+        now = time.monotonic()
+        if d.get('status') == 'downloading' and now - last_event.get(d.get('filename'), 0) < PROGRESS_INTERVAL:
+            return
+        last_event[d.get('filename')] = now
+        event = {
+            'file': label,
+            'status': d.get('status'),
+            'downloaded_bytes': d.get('downloaded_bytes'),
+            'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+            'speed': d.get('speed'),
+            'eta': d.get('eta')
+        }
+        for listener in PROGRESS_LISTENERS:
+            listener(getattr(_trace_context, 'movie_id', None), event)
+    
+    def hook(d):
+        if PROGRESS_LISTENERS:
+            notify_progress(d)
+        downloaded = d.get('downloaded_bytes') or 0
+        delta = downloaded - last_bytes.get(d.get('filename'), 0)
+        last_bytes[d.get('filename')] = downloaded
+        with _metrics_lock:
+            if delta > 0:
+                METRICS['download_bytes'] += delta
+                if job is not None:
+                    job['written'] += delta
+            if d.get('status') == 'finished' and d.get('elapsed'):
+                METRICS['throughput'].append(downloaded / d['elapsed'])
+                METRICS['throughput_total'][0] += downloaded / d['elapsed']
+                METRICS['throughput_total'][1] += 1
+        if d.get('status') == 'finished' and TRACE_FILE:
+            write_trace_event({
+                'ts': round(time.time(), 3),
+                'stage': 'transfer',
+                'file': label,
+                'bytes': downloaded,
+                'duration': round(d.get('elapsed') or 0, 4),
+                'movie_id': getattr(_trace_context, 'movie_id', None)
+            })
+    
+    return hook
+
+def percentile(samples, q):
+    """Nearest-rank percentile (q in 0..100) of a list of numbers, or None when empty"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+def render_prometheus_metrics():
+    """
+    Render the run's metrics in the Prometheus text exposition format.
+
+    Quantiles cover the latest METRICS_WINDOW samples, so a long-running
+    service scrapes in bounded time and memory; _sum and _count cover the
+    whole run.
+    """
+    with _metrics_lock:
+        stages = {stage: list(samples) for stage, samples in METRICS['stages'].items()}
+        stage_totals = {stage: tuple(totals) for stage, totals in METRICS['stage_totals'].items()}
+        throughput = list(METRICS['throughput'])
+        throughput_total = tuple(METRICS['throughput_total'])
+        download_bytes = METRICS['download_bytes']
+    
+    lines = [
+        "# HELP ytbot_stage_duration_seconds Time spent in each pipeline stage",
+        "# TYPE ytbot_stage_duration_seconds summary",
+    ]
+    for stage, samples in sorted(stages.items()):
+        for q in (50, 90, 99):
+            lines.append(f'ytbot_stage_duration_seconds{{stage="{stage}",quantile="{q / 100}"}} {percentile(samples, q):.6f}')
+        lines.append(f'ytbot_stage_duration_seconds_sum{{stage="{stage}"}} {stage_totals[stage][0]:.6f}')
+        lines.append(f'ytbot_stage_duration_seconds_count{{stage="{stage}"}} {stage_totals[stage][1]}')
+    
+    lines += [
+        "# HELP ytbot_download_bytes_total Bytes received by yt-dlp downloads",
+        "# TYPE ytbot_download_bytes_total counter",
+        f"ytbot_download_bytes_total {download_bytes}",
+        "# HELP ytbot_download_throughput_bytes_per_second Average throughput of finished file transfers",
+        "# TYPE ytbot_download_throughput_bytes_per_second summary",
+    ]
+    for q in (50, 90):
+        if throughput:
+            lines.append(f'ytbot_download_throughput_bytes_per_second{{quantile="{q / 100}"}} {percentile(throughput, q):.1f}')
+    lines += [
+        f"ytbot_download_throughput_bytes_per_second_sum {throughput_total[0]:.1f}",
+        f"ytbot_download_throughput_bytes_per_second_count {throughput_total[1]}",
+        "# HELP ytbot_extractions_total yt-dlp page extractions performed",
+        "# TYPE ytbot_extractions_total counter",
+        f"ytbot_extractions_total {EXTRACTION_STATS['extractions']}",
+        "# HELP ytbot_extractions_reused_total yt-dlp extractions avoided thanks to the info cache",
+        "# TYPE ytbot_extractions_reused_total counter",
+        f"ytbot_extractions_reused_total {EXTRACTION_STATS['reused']}",
+        "# HELP ytbot_rate_limit_wait_seconds_total Time spent waiting for a rate limit token",
+        "# TYPE ytbot_rate_limit_wait_seconds_total counter",
+    ]
+    lines += [f'ytbot_rate_limit_wait_seconds_total{{bucket="{name}"}} {stats["waiting"]:.3f}' for name, stats in RATE_LIMIT_STATS.items()]
+    lines += [
+        "# HELP ytbot_rate_limit_throttled_total Throttling responses received",
+        "# TYPE ytbot_rate_limit_throttled_total counter",
+    ]
+    lines += [f'ytbot_rate_limit_throttled_total{{bucket="{name}"}} {stats["throttled"]}' for name, stats in RATE_LIMIT_STATS.items()]
+    
+    scheduler = scheduler_snapshot()
+    lines += [
+        "# HELP ytbot_download_queue_depth Download jobs waiting for admission",
+        "# TYPE ytbot_download_queue_depth gauge",
+        f"ytbot_download_queue_depth {scheduler['waiting']}",
+        "# HELP ytbot_download_active_jobs Download jobs running",
+        "# TYPE ytbot_download_active_jobs gauge",
+        f"ytbot_download_active_jobs {scheduler['active']}",
+        "# HELP ytbot_download_reserved_bytes Disk space running jobs still expect to write",
+        "# TYPE ytbot_download_reserved_bytes gauge",
+        f"ytbot_download_reserved_bytes {scheduler['reserved_bytes']}",
+    ]
+    if BANDWIDTH_LIMIT:
+        lines += [
+            "# HELP ytbot_download_bandwidth_limit_bytes_per_second Global download bandwidth cap",
+            "# TYPE ytbot_download_bandwidth_limit_bytes_per_second gauge",
+            f"ytbot_download_bandwidth_limit_bytes_per_second {BANDWIDTH_LIMIT}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def write_metrics_file(path):
+    """Write the Prometheus metrics atomically (for node_exporter's textfile collector, for instance)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus_metrics())
+    os.replace(temp_path, path)
+
+def serve_metrics(port, host=SERVICE_HOST):
+    """Expose the metrics at http://<host>:<port>/metrics from a background thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus_metrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
+
+def start_profiling():
+    """
+    Profile the main thread and every thread started from now on (pipeline,
+    search and stream download pools), returning the profilers for save_profile.
+
+    Before Python 3.12 a cProfile profiler only sees the thread that enabled
+    it, so each new thread enables its own from a one-shot threading.setprofile
+    hook; from 3.12 on, one profiler sees every thread.
+    """
+    import cProfile
+    
+    profilers = [cProfile.Profile()]
+    if sys.version_info < (3, 12):
+        def profile_thread(frame, event, arg):
+            sys.setprofile(None)
+            profiler = cProfile.Profile()
+            profilers.append(profiler)
+            profiler.enable()
+        threading.setprofile(profile_thread)
+    profilers[0].enable()
+    return profilers
+
+def save_profile(profilers, path):
+    """Stop profiling, write the merged cProfile stats of all threads and show the hottest functions"""
+    import pstats
+    
+    threading.setprofile(None)
+    for profiler in profilers:
+        profiler.disable()
+    stats = pstats.Stats(profilers[0])
+    if len(profilers) > 1:
+        stats.add(*profilers[1:])
+    stats.dump_stats(path)
+    print(f"\n🔬 Profile of {len(profilers)} thread(s) written to {path} (top functions by cumulative time):")
+    stats.sort_stats('cumulative').print_stats(15)
+
+@contextmanager
+def open_db(path, schema):
+    """
+    Open one of the bot's SQLite files (created with `schema` if needed) as a transaction.
+
+    Connections are short-lived and WAL-journaled, so the same file can be
+    used safely from many threads and from several processes at once.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(schema)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+TMDB_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tmdb_movies (
+    movie_id TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tmdb_movies_accessed ON tmdb_movies (accessed_at);
+"""
+
+def tmdb_cache_get(movie_id):
+    """Return the cached TMDB entry for a movie (result, etag, last_modified, fetched_at) or None"""
+    with open_db(TMDB_CACHE_FILE, TMDB_CACHE_SCHEMA) as db:
+        row = db.execute("SELECT * FROM tmdb_movies WHERE movie_id = ?", (movie_id,)).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE tmdb_movies SET accessed_at = ? WHERE movie_id = ?", (time.time(), movie_id))
+    entry = dict(row)
+    entry['result'] = json.loads(entry['result'])
+    entry['result'].setdefault('id', int(movie_id) if movie_id.isdigit() else movie_id)  # Entries cached before 'id' was kept
+    return entry
+
+def tmdb_cache_put(movie_id, result, etag=None, last_modified=None):
+    """Store a normalized TMDB result, evicting the least recently used entries beyond TMDB_CACHE_MAX_ENTRIES"""
+    now = time.time()
+    with open_db(TMDB_CACHE_FILE, TMDB_CACHE_SCHEMA) as db:
+        db.execute(
+            "INSERT OR REPLACE INTO tmdb_movies VALUES (?, ?, ?, ?, ?, ?)",
+            (movie_id, json.dumps(result, ensure_ascii=False), etag, last_modified, now, now)
+        )
+        db.execute(
+            "DELETE FROM tmdb_movies WHERE movie_id NOT IN "
+            "(SELECT movie_id FROM tmdb_movies ORDER BY accessed_at DESC LIMIT ?)",
+            (TMDB_CACHE_MAX_ENTRIES,)
+        )
+
+def tmdb_cache_touch(movie_id):
+    """Mark a cached entry as fresh again after a successful revalidation"""
+    now = time.time()
+    with open_db(TMDB_CACHE_FILE, TMDB_CACHE_SCHEMA) as db:
+        db.execute("UPDATE tmdb_movies SET fetched_at = ?, accessed_at = ? WHERE movie_id = ?", (now, now, movie_id))
+
+def purge_tmdb_cache():
+    """Remove every cached TMDB entry and return how many were deleted"""
+    with open_db(TMDB_CACHE_FILE, TMDB_CACHE_SCHEMA) as db:
+        return db.execute("DELETE FROM tmdb_movies").rowcount
+
+RATE_LIMIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL
+);
+"""
+
+def refill_bucket(state, limit, now):
+    """Return the token bucket state advanced to `now` (tokens capped at the burst size)"""
+    if state is None:
+        return {'tokens': float(limit['burst']), 'rate': float(limit['rate']), 'updated_at': now, 'blocked_until': 0.0}
+    elapsed = max(0.0, now - state['updated_at'])
+    state['tokens'] = min(float(limit['burst']), state['tokens'] + elapsed * state['rate'])
+    state['updated_at'] = now
+    return state
+
+def update_bucket(name, change):
+    """
+    Apply `change(state, limit, now)` to a bucket under the right lock and return its result.
+
+    Buckets live in this process by default; with RATE_LIMIT_FILE set they
+    live in SQLite so every process on the machine shares the same budget.
+    """
+    limit = RATE_LIMITS[name]
+    if not RATE_LIMIT_FILE:
+        with _rate_limit_lock:
+            now = time.time()
+            state = refill_bucket(_rate_limit_buckets.get(name), limit, now)
+            _rate_limit_buckets[name] = state
+            return change(state, limit, now)
+    
+    with open_db(RATE_LIMIT_FILE, RATE_LIMIT_SCHEMA) as db:
+        db.execute("BEGIN IMMEDIATE")
+        now = time.time()  # Read after taking the lock, other processes may have waited before us
+        row = db.execute("SELECT tokens, rate, updated_at, blocked_until FROM buckets WHERE name = ?", (name,)).fetchone()
+        state = refill_bucket(dict(row) if row else None, limit, now)
+        result = change(state, limit, now)
+        db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                   (name, state['tokens'], state['rate'], state['updated_at'], state['blocked_until']))
+        return result
+
+def take_token(state, limit, now):
+    """Consume one token if possible; otherwise return how long to wait before trying again"""
+    if now >= state['blocked_until'] and state['tokens'] >= 1:
+        state['tokens'] -= 1
+        return 0.0
+    return max(state['blocked_until'] - now, (1 - state['tokens']) / state['rate'], 0.01)
+
+def rate_limit_wait(name):
+    """Block until the named bucket ('tmdb' or 'youtube') grants one request"""
+    started = time.time()
+    while True:
+        delay = update_bucket(name, take_token)
+        if not delay:
+            break
+        time.sleep(delay)
+    with _rate_limit_lock:
+        RATE_LIMIT_STATS[name]['requests'] += 1
+        RATE_LIMIT_STATS[name]['waiting'] += time.time() - started
+
+def rate_limit_feedback(name, throttled=False, retry_after=None):
+    """
+    Adapt a bucket to the server's answer: halve the rate and pause on a
+    throttling response (honouring Retry-After), then slowly recover the
+    configured rate on successes.
+    """
+    def adapt(state, limit, now):
+        if throttled:
+            state['rate'] = max(limit['rate'] * RATE_LIMIT_MIN_FACTOR, state['rate'] / 2)
+            state['tokens'] = 0.0
+            state['blocked_until'] = max(state['blocked_until'], now + (retry_after or 1 / state['rate']))
+        else:
+            state['rate'] = min(float(limit['rate']), state['rate'] + limit['rate'] * RATE_LIMIT_RECOVERY)
+    
+    if throttled:
+        with _rate_limit_lock:
+            RATE_LIMIT_STATS[name]['throttled'] += 1
+        print(f"🐢 {name} is throttling requests, slowing down" + (f" (retry after {retry_after:.1f}s)" if retry_after else ""))
+    elif not RATE_LIMIT_FILE and _rate_limit_buckets.get(name, {}).get('rate', 0) >= RATE_LIMITS[name]['rate']:
+        return  # Already at full speed: nothing to recover
+    update_bucket(name, adapt)
+
+@contextmanager
+def rate_limited(name):
+    """Wait for the named rate limit, then count the time spent inside the block as work"""
+    rate_limit_wait(name)
+    started = time.time()
+    try:
+        yield
+    finally:
+        with _rate_limit_lock:
+            RATE_LIMIT_STATS[name]['working'] += time.time() - started
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def is_throttling_error(error):
+    """Tell whether a yt-dlp error means YouTube is rate limiting us"""
+    message = str(error)
+    return any(marker in message for marker in ('HTTP Error 429', 'HTTP Error 403', 'Too Many Requests', 'not a bot'))
+
+def youtube_call(func, *args, **kwargs):
+    """Run one yt-dlp extraction or search under the shared 'youtube' rate limit"""
+    with rate_limited('youtube'):
+        try:
+            result = func(*args, **kwargs)
+        except load_yt_dlp().DownloadError as e:
+            if is_throttling_error(e):
+                rate_limit_feedback('youtube', throttled=True)
+            raise
+    rate_limit_feedback('youtube')
+    return result
+
+def print_rate_limit_stats():
+    """Report time spent waiting for rate limits versus time spent on the rate-limited calls"""
+    for name, stats in RATE_LIMIT_STATS.items():
+        if stats['requests']:
+            print(f"⏳ {name}: {stats['requests']} request(s), waited {stats['waiting']:.1f}s, "
+                  f"working {stats['working']:.1f}s, throttled {stats['throttled']} time(s)")
+
+def get_http_session():
+    """Return the shared keep-alive HTTP session, creating it on first use"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = load_requests().Session()
+            adapter = load_requests().adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+def tmdb_request(path, params=None, extra_headers=None):
+    """
+    GET a TMDB API path over the shared session under the 'tmdb' rate limit.
+
+    429 responses slow the limiter down and are retried after Retry-After.
+    Raises for other HTTP errors (304 Not Modified is returned).
+    """
     headers = {
         'Authorization': f'Bearer {TMDB_API_KEY}',
         'Content-Type': 'application/json;charset=utf-8'
     }
-    
-    try:
-        url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-        print_loading("Fetching movie details from TMDB")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        movie_data = response.json()
-        
-        videos_url = f"{TMDB_BASE_URL}/movie/{movie_id}/videos"
-        response = requests.get(videos_url, headers=headers)
+    headers.update(extra_headers or {})
+    for attempt in range(TMDB_THROTTLE_RETRIES + 1):
+        with rate_limited('tmdb'):
+            response = get_http_session().get(f"{TMDB_BASE_URL}{path}", headers=headers, params=params, timeout=TMDB_TIMEOUT)
+        if response.status_code != 429:
+            rate_limit_feedback('tmdb')
+            break
+        rate_limit_feedback('tmdb', throttled=True, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+    if response.status_code != 304:
         response.raise_for_status()
-        videos_data = response.json()
-        
-        credits_url = f"{TMDB_BASE_URL}/movie/{movie_id}/credits"
-        response = requests.get(credits_url, headers=headers)
-        response.raise_for_status()
-        credits_data = response.json()
+    return response
+
+def tmdb_get(path, params=None):
+    """GET a TMDB API path over the shared session and return the decoded JSON"""
+    return tmdb_request(path, params).json()
+
+def build_movie_result(movie_data):
+    """Normalize a TMDB movie payload (with videos/credits/release_dates appended) into the bot's result dict"""
+    videos_data = movie_data.get('videos') or {}
+    credits_data = movie_data.get('credits') or {}
+    release_data = movie_data.get('release_dates') or {}
+    
+    directors = [crew['name'] for crew in credits_data.get('crew', []) if crew['job'] == 'Director']
+    main_actors = [cast['name'] for cast in credits_data.get('cast', [])][:3]
+    
+    certification = None
+    for country in release_data.get('results', []):
+        if country['iso_3166_1'] == 'US':
+            for release in country.get('release_dates', []):
+                if release.get('certification'):
+                    certification = release['certification']
+                    break
+    
+    youtube_videos = [v for v in videos_data.get('results', []) if v['site'] == 'YouTube']
+    
+    return {
+        'id': movie_data.get('id'),
+        'title': movie_data.get('title'),
+        'original_title': movie_data.get('original_title'),
+        'year': movie_data.get('release_date', '')[:4] if movie_data.get('release_date') else 'Unknown',
+        'directors': directors,
+        'main_actors': main_actors,
+        'runtime': movie_data.get('runtime'),
+        'genres': [g['name'] for g in movie_data.get('genres', [])],
+        'certification': certification,
+        'youtube_videos': youtube_videos,
+        'overview': movie_data.get('overview'),
+        'poster_path': f"https://image.tmdb.org/t/p/original{movie_data.get('poster_path', '')}" if movie_data.get('poster_path') else None,
+        'backdrop_path': f"https://image.tmdb.org/t/p/original{movie_data.get('backdrop_path', '')}" if movie_data.get('backdrop_path') else None,
+        'status': 'success'
+    }
+
+def fetch_tmdb_movie(movie_id, validators=None):
+    """
+    Fetch the raw TMDB payload for a movie.
+
+    One request with `append_to_response` normally returns everything. Any
+    sub-resource missing from that response (or all of them, when
+    TMDB_USE_APPEND is off) is fetched with concurrent requests instead.
+
+    `validators` (ETag / Last-Modified of a cached copy) make the combined
+    request conditional. Returns (movie_data, response_headers), with
+    movie_data set to None when TMDB answered 304 Not Modified.
+    """
+    if TMDB_USE_APPEND:
+        conditional = {}
+        if validators and validators.get('etag'):
+            conditional['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            conditional['If-Modified-Since'] = validators['last_modified']
         
-        release_url = f"{TMDB_BASE_URL}/movie/{movie_id}/release_dates"
-        response = requests.get(release_url, headers=headers)
-        response.raise_for_status()
-        release_data = response.json()
+        response = tmdb_request(f"/movie/{movie_id}", {'append_to_response': ','.join(TMDB_APPEND)}, conditional)
+        if response.status_code == 304:
+            return None, response.headers
         
-        directors = [crew['name'] for crew in credits_data.get('crew', []) if crew['job'] == 'Director']
-        main_actors = [cast['name'] for cast in credits_data.get('cast', [])][:3]
+        movie_data = response.json()
+        missing = [part for part in TMDB_APPEND if part not in movie_data]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                parts = executor.map(lambda part: tmdb_get(f"/movie/{movie_id}/{part}"), missing)
+                movie_data.update(zip(missing, parts))
+        return movie_data, response.headers
+    
+    paths = [f"/movie/{movie_id}"] + [f"/movie/{movie_id}/{part}" for part in TMDB_APPEND]
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        movie_data, *parts = executor.map(tmdb_get, paths)
+    movie_data.update(zip(TMDB_APPEND, parts))
+    return movie_data, {}
+
+@timed('tmdb')
+def get_tmdb_movie_details(movie_id, quiet=False):
+    """
+    Fetch movie details from TMDB API.
+
+    Results are kept in the on-disk TMDB cache: fresh entries are returned
+    without any request, stale ones are revalidated with ETag/Last-Modified.
+    """
+    movie_id = str(movie_id)
+    cached = tmdb_cache_get(movie_id) if TMDB_CACHE_ENABLED else None
+    if cached and time.time() - cached['fetched_at'] < TMDB_CACHE_TTL:
+        if not quiet:
+            print(f"✅ Loaded movie details from cache")
+        return cached['result']
+    
+    try:
+        if not quiet:
+            print_loading("Fetching movie details from TMDB")
+        movie_data, headers = fetch_tmdb_movie(movie_id, cached)
         
-        certification = None
-        for country in release_data.get('results', []):
-            if country['iso_3166_1'] == 'US':
-                for release in country.get('release_dates', []):
-                    if release.get('certification'):
-                        certification = release['certification']
-                        break
+        if movie_data is None:
+            tmdb_cache_touch(movie_id)
+            if not quiet:
+                print(f"\r✅ Cached movie details are still current (TMDB: not modified)")
+            return cached['result']
         
-        youtube_videos = [v for v in videos_data.get('results', []) if v['site'] == 'YouTube']
-        
-        result = {
-            'title': movie_data.get('title'),
-            'original_title': movie_data.get('original_title'),
-            'year': movie_data.get('release_date', '')[:4] if movie_data.get('release_date') else 'Unknown',
-            'directors': directors,
-            'main_actors': main_actors,
-            'runtime': movie_data.get('runtime'),
-            'genres': [g['name'] for g in movie_data.get('genres', [])],
-            'certification': certification,
-            'youtube_videos': youtube_videos,
-            'overview': movie_data.get('overview'),
-            'poster_path': f"https://image.tmdb.org/t/p/original{movie_data.get('poster_path', '')}" if movie_data.get('poster_path') else None,
-            'backdrop_path': f"https://image.tmdb.org/t/p/original{movie_data.get('backdrop_path', '')}" if movie_data.get('backdrop_path') else None,
-            'status': 'success'
-        }
+        result = build_movie_result(movie_data)
+        if TMDB_CACHE_ENABLED:
+            tmdb_cache_put(movie_id, result, headers.get('ETag'), headers.get('Last-Modified'))
         
-        print(f"\r✅ Fetched movie details from TMDB successfully")
+        if not quiet:
+            print(f"\r✅ Fetched movie details from TMDB successfully")
         return result
         
-    except requests.exceptions.RequestException as e:
-        print(f"\r❌ Failed to fetch TMDB data: {str(e)}")
+    except load_requests().exceptions.RequestException as e:
+        if cached:
+            print(f"\r⚠️ TMDB unreachable for {movie_id}, using stale cached details: {str(e)}")
+            return cached['result']
+        print(f"\r❌ Failed to fetch TMDB data for {movie_id}: {str(e)}")
         return {'status': 'error', 'message': str(e)}
 
+def get_tmdb_movie_details_bulk(movie_ids, max_workers=METADATA_WORKERS):
+    """Fetch details for many movies concurrently; results come back in the order of movie_ids"""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(movie_ids))) as executor:
+        return list(executor.map(partial(get_tmdb_movie_details, quiet=True), movie_ids))
+
+CATALOGUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS offered (
+    cursor TEXT NOT NULL,
+    movie_id TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (cursor, movie_id)
+);
+"""
+
+def catalogue_cursor_name(source, filters=None, list_id=None):
+    """Cursor key of a catalogue sync: each source/list/filter combination keeps its own position"""
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    return ":".join([source, str(list_id or '')] + [f"{k}={v}" for k, v in sorted(filters.items())])
+
+def load_catalogue_cursor(name):
+    """Saved state of a catalogue cursor, or an empty dict"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        row = db.execute("SELECT state FROM cursors WHERE name = ?", (name,)).fetchone()
+    return json.loads(row['state']) if row else {}
+
+def save_catalogue_cursor(name, state):
+    """Checkpoint a cursor's page position"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        db.execute("INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)", (name, json.dumps(state), time.time()))
+
+def catalogue_offered(name, movie_id):
+    """Record that a cursor handed a movie to the pipeline; it stays unfinished until catalogue_finished"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        db.execute(
+            "INSERT INTO offered VALUES (?, ?, 0) ON CONFLICT (cursor, movie_id) DO UPDATE SET finished = 0",
+            (name, movie_id)
+        )
+
+def catalogue_finished(name, movie_id):
+    """Record that the pipeline wrote a result for a movie a cursor handed out"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        db.execute("UPDATE offered SET finished = 1 WHERE cursor = ? AND movie_id = ?", (name, movie_id))
+
+def unfinished_catalogue_movies(name):
+    """Movies a cursor handed out that never got a result (queued or in flight when a sync stopped)"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        return [row['movie_id'] for row in db.execute("SELECT movie_id FROM offered WHERE cursor = ? AND finished = 0", (name,))]
+
+def reset_catalogue_cursor(name):
+    """Forget a cursor's position and the movies it handed out, so the next sync starts over"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        db.execute("DELETE FROM cursors WHERE name = ?", (name,))
+        db.execute("DELETE FROM offered WHERE cursor = ?", (name,))
+
+def already_offered(name, movie_ids):
+    """The subset of movie_ids a cursor handed out on an earlier sync"""
+    with open_db(CATALOGUE_FILE, CATALOGUE_SCHEMA) as db:
+        return {
+            row['movie_id'] for row in db.execute(
+                f"SELECT movie_id FROM offered WHERE cursor = ? AND movie_id IN ({','.join('?' * len(movie_ids))})",
+                (name, *movie_ids)
+            )
+        }
+
+def expire_tmdb_cache(movie_ids):
+    """Make cached details due for revalidation (e.g. TMDB reported the movies changed)"""
+    with open_db(TMDB_CACHE_FILE, TMDB_CACHE_SCHEMA) as db:
+        db.executemany("UPDATE tmdb_movies SET fetched_at = 0 WHERE movie_id = ?", [(movie_id,) for movie_id in movie_ids])
+
+def tmdb_genre_ids(genres):
+    """TMDB genre IDs for genre names or IDs (discover only filters by ID)"""
+    known = {genre['name'].lower(): genre['id'] for genre in tmdb_get("/genre/movie/list").get('genres', [])}
+    ids = []
+    for genre in genres:
+        if str(genre).isdigit():
+            ids.append(int(genre))
+        elif genre.lower() in known:
+            ids.append(known[genre.lower()])
+        else:
+            raise ValueError(f"unknown TMDB genre: {genre}")
+    return ids
+
+def tmdb_genre_names(genres):
+    """TMDB genre names for genre names or IDs (movie details only carry names)"""
+    if all(not str(genre).isdigit() for genre in genres):
+        return list(genres)
+    known = {genre['id']: genre['name'] for genre in tmdb_get("/genre/movie/list").get('genres', [])}
+    names = []
+    for genre in genres:
+        if not str(genre).isdigit():
+            names.append(genre)
+        elif int(genre) in known:
+            names.append(known[int(genre)])
+        else:
+            raise ValueError(f"unknown TMDB genre ID: {genre}")
+    return names
+
+def matches_catalogue_filters(movie_data, filters):
+    """Client-side filtering (year, genres, runtime) of full movie details, for endpoints that cannot filter"""
+    if filters.get('year') and str(movie_data.get('year')) != str(filters['year']):
+        return False
+    if filters.get('genres'):
+        wanted = {str(genre).lower() for genre in filters['genres']}
+        if not wanted & {genre.lower() for genre in movie_data.get('genres', [])}:
+            return False
+    runtime = movie_data.get('runtime') or 0
+    if filters.get('min_runtime') and runtime < filters['min_runtime']:
+        return False
+    if filters.get('max_runtime') and runtime > filters['max_runtime']:
+        return False
+    return True
+
+def iter_tmdb_pages(path, params, first_page=1):
+    """Lazily GET the pages of a paginated TMDB endpoint, yielding (page, items, total_pages)"""
+    page = first_page
+    while True:
+        data = tmdb_get(path, dict(params, page=page))
+        items = data.get('results', data.get('items')) or []
+        total_pages = min(data.get('total_pages') or page, CATALOGUE_MAX_PAGES)
+        yield page, items, total_pages
+        if page >= total_pages or not items:
+            return
+        page += 1
+
+def iter_tmdb_catalogue(source, filters=None, list_id=None, since=None, checkpoint=True):
+    """
+    Page lazily through TMDB `discover`, a list, or `changes`, yielding
+    {'movie_id': ..., 'movie_data': ...} for every movie matching `filters`
+    (year, genres, min_runtime, max_runtime).
+
+    - discover filters on TMDB's side and yields IDs only; the metadata
+      stage fetches the details as usual. It walks release dates upwards
+      (up to today) and a finished sync saves the newest date it reached as
+      a watermark, so the next one only asks for releases from that day on
+      instead of paging through the whole history again (and a first sync
+      cut short by TMDB's 500-page limit carries on from there).
+    - list and changes cannot filter, so the details of each page are
+      fetched concurrently (cached, rate limited) to filter locally and
+      are handed over as `movie_data`, in get_tmdb_movie_details' format,
+      so the metadata stage does not fetch them again.
+    - changes walks date windows from `since` (or the last sync) to today
+      and revalidates the cached details of every changed movie.
+
+    With `checkpoint`, the page position is saved after each page, so an
+    interrupted sync resumes where it stopped. Every movie is recorded as
+    offered before it is yielded; the consumer reports results through
+    catalogue_finished, and movies that never got one (queued or in flight
+    when a sync stopped) are yielded again first on the next sync. discover
+    and list also skip the movies offered by earlier syncs, so a daily run
+    only yields new ones. Pages are requested as the consumer pulls, under
+    the 'tmdb' rate limit.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    name = catalogue_cursor_name(source, filters, list_id)
+    state = load_catalogue_cursor(name) if checkpoint else {}
+    if source != 'discover' and filters.get('genres'):
+        filters['genres'] = tmdb_genre_names(filters['genres'])  # Filtered locally, against genre names
+    
+    offered = set()  # Movies yielded during this sync
+    
+    def produce(page_items, prefetch, skip_offered):
+        ids = [str(item['id']) for item in page_items if not item.get('adult') and str(item['id']) not in offered]
+        if skip_offered and checkpoint and ids:
+            seen = already_offered(name, ids)
+            ids = [movie_id for movie_id in ids if movie_id not in seen]
+        if not prefetch:
+            return [{'movie_id': movie_id, 'movie_data': None} for movie_id in ids]
+        details = get_tmdb_movie_details_bulk(ids)
+        return [
+            {'movie_id': movie_id, 'movie_data': movie_data}
+            for movie_id, movie_data in zip(ids, details)
+            if movie_data.get('status') == 'success' and matches_catalogue_filters(movie_data, filters)
+        ]
+    
+    def walk(path, params, prefetch, skip_offered, window=None):
+        first_page = state.get('page', 0) + 1 if state.get('window') == window else 1
+        for page, items, total_pages in iter_tmdb_pages(path, params, first_page):
+            if window is not None and TMDB_CACHE_ENABLED and items:
+                expire_tmdb_cache([str(item['id']) for item in items])
+            records = produce(items, prefetch, skip_offered)
+            print(f"📚 {source} page {page}/{total_pages}: {len(records)} movie(s) to process")
+            for record in records:
+                offered.add(record['movie_id'])
+                if checkpoint:
+                    catalogue_offered(name, record['movie_id'])
+                yield record
+            dates = [item['release_date'] for item in items if item.get('release_date')]
+            if source == 'discover' and dates:
+                state['seen_until'] = max(state.get('seen_until', ''), *dates)
+            state.update(page=page, window=window)
+            if checkpoint:
+                save_catalogue_cursor(name, state)
+        state.update(page=0, window=None)
+    
+    if checkpoint:
+        unfinished = unfinished_catalogue_movies(name)
+        if unfinished:
+            print(f"📚 {source}: {len(unfinished)} movie(s) left unfinished by the last sync")
+        for movie_id in unfinished:
+            offered.add(movie_id)
+            yield {'movie_id': movie_id, 'movie_data': None}
+    
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    if source == 'discover':
+        params = {'include_adult': 'false', 'sort_by': 'primary_release_date.asc', 'primary_release_date.lte': today}
+        if state.get('watermark'):
+            # Only what earlier syncs have not reached (same-day releases are re-listed, then skipped as offered)
+            params['primary_release_date.gte'] = state['watermark']
+        if filters.get('year'):
+            params['primary_release_year'] = filters['year']
+        if filters.get('genres'):
+            params['with_genres'] = '|'.join(map(str, tmdb_genre_ids(filters['genres'])))  # Any of them
+        if filters.get('min_runtime'):
+            params['with_runtime.gte'] = filters['min_runtime']
+        if filters.get('max_runtime'):
+            params['with_runtime.lte'] = filters['max_runtime']
+        yield from walk("/discover/movie", params, prefetch=False, skip_offered=True)
+        if state.get('seen_until'):
+            state['watermark'] = state.pop('seen_until')
+    elif source == 'list':
+        yield from walk(f"/list/{list_id}", {}, prefetch=True, skip_offered=True)
+    elif source == 'changes':
+        start = state.get('since') or since or time.strftime('%Y-%m-%d', time.gmtime(time.time() - 24 * 60 * 60))
+        while start < today:
+            end = min(today, time.strftime('%Y-%m-%d', time.gmtime(time.mktime(time.strptime(start, '%Y-%m-%d')) + CHANGES_WINDOW_DAYS * 24 * 60 * 60)))
+            yield from walk("/movie/changes", {'start_date': start, 'end_date': end}, prefetch=True, skip_offered=False, window=start)
+            state['since'] = start = end
+            if checkpoint:
+                save_catalogue_cursor(name, state)
+    else:
+        raise ValueError(f"unknown catalogue source: {source}")
+    
+    if checkpoint:
+        save_catalogue_cursor(name, state)
+
 def display_movie_info(movie_data):
     """Display the movie information in a user-friendly way"""
     print("\n🎬 Movie Information:")
@@ -166,8 +1103,253 @@ def calculate_match_score(video_info, movie_data):
     
     return min(score, 1.0)  # Cap at 1.0
 
-def search_youtube_full_movie(movie_data, lang='fr'):
-    """Search YouTube for the best matching full movie based on TMDB data"""
+EXTRACTION_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    url TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    extracted_at REAL NOT NULL
+);
+"""
+
+def remember_video_info(info, url=None, extracted_at=None, persist=True):
+    """Store an extracted (sanitized) info dict under its request URL and its canonical webpage URL"""
+    extracted_at = extracted_at or time.time()
+    keys = {k for k in (url, info.get('webpage_url'), info.get('original_url')) if k}
+    with _extraction_lock:
+        for key in keys:
+            _extraction_cache[key] = (extracted_at, info)
+            _extraction_cache.move_to_end(key)
+        while len(_extraction_cache) > EXTRACTION_CACHE_MAX_ENTRIES:
+            _extraction_cache.popitem(last=False)
+    
+    if persist and EXTRACTION_CACHE_PERSIST:
+        payload = json.dumps(info, ensure_ascii=False)
+        with open_db(EXTRACTION_CACHE_FILE, EXTRACTION_CACHE_SCHEMA) as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?)",
+                [(key, payload, extracted_at) for key in keys]
+            )
+            db.execute("DELETE FROM extractions WHERE extracted_at < ?", (time.time() - EXTRACTION_CACHE_TTL,))
+
+def forget_video_info(url):
+    """Drop a cached info dict, e.g. after its stream URLs stopped working"""
+    with _extraction_lock:
+        _extraction_cache.pop(url, None)
+    if EXTRACTION_CACHE_PERSIST:
+        with open_db(EXTRACTION_CACHE_FILE, EXTRACTION_CACHE_SCHEMA) as db:
+            db.execute("DELETE FROM extractions WHERE url = ?", (url,))
+
+def cached_video_info(url):
+    """Return a still-fresh cached info dict for a URL (memory first, then disk) or None"""
+    with _extraction_lock:
+        entry = _extraction_cache.get(url)
+    if entry is None and EXTRACTION_CACHE_PERSIST:
+        with open_db(EXTRACTION_CACHE_FILE, EXTRACTION_CACHE_SCHEMA) as db:
+            row = db.execute("SELECT info, extracted_at FROM extractions WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            entry = (row['extracted_at'], json.loads(row['info']))
+            remember_video_info(entry[1], url, entry[0], persist=False)
+    
+    if entry is None or time.time() - entry[0] > EXTRACTION_CACHE_TTL:
+        return None
+    return entry[1]
+
+def note_extraction_reused():
+    """Count one yt-dlp extraction that was avoided thanks to the cache"""
+    with _extraction_lock:
+        EXTRACTION_STATS['reused'] += 1
+
+def extract_video_info(url, verbose=False):
+    """
+    Return the yt-dlp info dict for a video, extracting the page at most once.
+
+    The dict is sanitized the same way yt-dlp writes `.info.json` files, so
+    it can be fed back to `YoutubeDL.process_ie_result` for every later
+    download. Callers must not modify it. Raises DownloadError like
+    `YoutubeDL.extract_info`.
+    """
+    info = cached_video_info(url)
+    if info is not None:
+        note_extraction_reused()
+        return info
+    
+    with timed('extract', url=url), load_yt_dlp().YoutubeDL({'quiet': not verbose, 'skip_download': True}) as ydl:
+        info = load_yt_dlp().YoutubeDL.sanitize_info(youtube_call(ydl.extract_info, url, download=False), remove_private_keys=True)
+    with _extraction_lock:
+        EXTRACTION_STATS['extractions'] += 1
+    remember_video_info(info, url)
+    return info
+
+def print_extraction_stats():
+    """Report how many yt-dlp extractions the info cache saved"""
+    if EXTRACTION_STATS['reused']:
+        print(f"♻️ Video info reused {EXTRACTION_STATS['reused']} time(s), {EXTRACTION_STATS['extractions']} extraction(s) performed")
+
+def title_trigrams(text):
+    """Character trigrams of a title normalized to lowercase words separated by single spaces"""
+    words = re.findall(r'[^\W_]+', (text or '').lower())
+    padded = f"  {' '.join(words)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def make_candidate_scorer(movie_data):
+    """
+    Build a fast scoring function for many candidates of one movie.
+
+    Keeps the weights of calculate_match_score (title 40%, duration 30%,
+    "full movie" 10%, year 10%, TMDB official 10%) but everything derived
+    from the movie is computed once, and title similarity is a trigram Dice
+    coefficient (linear in title length) instead of two SequenceMatcher
+    ratios per candidate.
+    """
+    movie_grams = [grams for grams in (title_trigrams(movie_data.get('title')), title_trigrams(movie_data.get('original_title'))) if grams]
+    movie_year = movie_data.get('year', '')
+    tmdb_duration = movie_data['runtime'] * 60 if movie_data.get('runtime') else None
+    
+    def score(video_info):
+        video_title = (video_info.get('title') or '').lower()
+        video_grams = title_trigrams(video_title)
+        
+        title_similarity = max(
+            (2 * len(video_grams & grams) / (len(video_grams) + len(grams)) for grams in movie_grams),
+            default=0.0
+        )
+        total = title_similarity * 0.4
+        
+        if tmdb_duration and video_info.get('duration'):
+            duration_diff = abs(video_info['duration'] - tmdb_duration)
+            if duration_diff <= MAX_DURATION_DIFF:
+                total += (1 - duration_diff / MAX_DURATION_DIFF) * 0.3
+        
+        if 'full movie' in video_title or 'full film' in video_title:
+            total += 0.1
+        if movie_year and movie_year in video_title:
+            total += 0.1
+        if video_info.get('is_tmdb_official', False):
+            total += 0.1
+        
+        return min(total, 1.0)
+    
+    return score
+
+def score_candidates(candidates, movie_data):
+    """Score a whole candidate list against one movie; returns scores in candidate order (None for malformed entries)"""
+    scorer = make_candidate_scorer(movie_data)
+    scores = []
+    for candidate in candidates:
+        try:
+            scores.append(scorer(candidate))
+        except Exception:
+            scores.append(None)
+    return scores
+
+DECISION_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    movie_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    video_id TEXT,
+    title TEXT,
+    score REAL NOT NULL,
+    duration REAL,
+    decided_at REAL NOT NULL
+);
+"""
+
+def save_match_decision(movie_data, video, url):
+    """
+    Remember a confident TMDB ID -> YouTube URL decision for later runs.
+
+    The video is scored with calculate_match_score, the scorer that
+    reuse_match_decision revalidates with, whatever scorer picked it: a
+    decision stored just above DECISION_MIN_SCORE must not be evicted on the
+    next run.
+    """
+    if not DECISION_CACHE_ENABLED or movie_data.get('id') is None:
+        return
+    score = calculate_match_score(video, movie_data)
+    if score < DECISION_MIN_SCORE:
+        return
+    with open_db(DECISION_CACHE_FILE, DECISION_CACHE_SCHEMA) as db:
+        db.execute(
+            "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(movie_data['id']), url, video.get('id'), video.get('title'), round(score, 4), video.get('duration'), time.time())
+        )
+
+def forget_match_decision(movie_id):
+    """Drop a cached decision that no longer holds"""
+    with open_db(DECISION_CACHE_FILE, DECISION_CACHE_SCHEMA) as db:
+        db.execute("DELETE FROM decisions WHERE movie_id = ?", (str(movie_id),))
+
+def reuse_match_decision(movie_data):
+    """
+    Return the cached decision for a movie if it still holds, else None.
+
+    The video is probed through extract_video_info: a removed or private
+    video, or one that now scores below DECISION_MIN_SCORE, evicts the
+    decision. The probe's info dict stays in the extraction cache, so the
+    download that follows does not extract the page again.
+    """
+    if not DECISION_CACHE_ENABLED or movie_data.get('id') is None:
+        return None
+    movie_id = str(movie_data['id'])
+    with open_db(DECISION_CACHE_FILE, DECISION_CACHE_SCHEMA) as db:
+        row = db.execute("SELECT * FROM decisions WHERE movie_id = ?", (movie_id,)).fetchone()
+    if row is None:
+        return None
+    decision = dict(row)
+    if decision['score'] < DECISION_MIN_SCORE:
+        forget_match_decision(movie_id)
+        return None
+    
+    try:
+        info = extract_video_info(decision['url'])
+    except load_yt_dlp().DownloadError as e:
+        if not is_throttling_error(e):
+            print(f"🗑️ Previously chosen video is gone, searching again: {decision['url']}")
+            forget_match_decision(movie_id)
+        return None
+    
+    score = calculate_match_score(info, movie_data)
+    if score < DECISION_MIN_SCORE:
+        print(f"🗑️ Previously chosen video now scores {score:.2f}, searching again")
+        forget_match_decision(movie_id)
+        return None
+    decision.update({'title': info.get('title'), 'duration': info.get('duration'), 'score': round(score, 4)})
+    return decision
+
+def export_match_decisions(path):
+    """Write every cached decision to a JSONL file and return how many were written"""
+    with open_db(DECISION_CACHE_FILE, DECISION_CACHE_SCHEMA) as db:
+        rows = db.execute("SELECT * FROM decisions ORDER BY movie_id").fetchall()
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(row), ensure_ascii=False) + '\n')
+    return len(rows)
+
+def import_match_decisions(path):
+    """Merge decisions from a JSONL export (the most recent decision per movie wins); returns how many were read"""
+    columns = ('movie_id', 'url', 'video_id', 'title', 'score', 'duration', 'decided_at')
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    with open_db(DECISION_CACHE_FILE, DECISION_CACHE_SCHEMA) as db:
+        db.executemany(
+            "INSERT INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (movie_id) DO UPDATE SET url = excluded.url, video_id = excluded.video_id, "
+            "title = excluded.title, score = excluded.score, duration = excluded.duration, "
+            "decided_at = excluded.decided_at WHERE excluded.decided_at > decisions.decided_at",
+            [tuple(str(row[c]) if c == 'movie_id' else row.get(c) for c in columns) for row in rows]
+        )
+    return len(rows)
+
+@timed('search')
+def search_youtube_full_movie(movie_data, lang='fr', report=None):
+    """
+    Search YouTube for the best matching full movie based on TMDB data.
+
+    If a `report` dict is given, it is filled with the chosen match
+    (url, title, duration, score) so callers can log the decision.
+    """
+    if report is None:
+        report = {}
     print("\n🔍 Searching YouTube for best matching movie...")
     
     # First check TMDB official videos
@@ -175,90 +1357,93 @@ def search_youtube_full_movie(movie_data, lang='fr'):
         for video in movie_data['youtube_videos']:
             if video['type'].lower() in ('full movie', 'movie'):
                 print(f"✅ Using official full movie from TMDB data: {video['name']}")
-                return f"https://www.youtube.com/watch?v={video['key']}"
+                url = f"https://www.youtube.com/watch?v={video['key']}"
+                report.update({'url': url, 'title': video.get('name'), 'score': 1.0, 'source': 'tmdb'})
+                return url
     
-    # Construct search query
-    query = YOUTUBE_SEARCH_TEMPLATE.format(
-        movie_data.get('title'),
-        movie_data.get('year'),
-        " ".join(movie_data.get('genres', [])[:1])
-    )
+    # Then a match decided on an earlier run, if it still holds
+    decision = reuse_match_decision(movie_data)
+    if decision:
+        print(f"✅ Using match decided on an earlier run: {decision['title']} (score {decision['score']:.2f})")
+        report.update({
+            'url': decision['url'],
+            'title': decision['title'],
+            'duration': decision['duration'],
+            'score': decision['score'],
+            'source': 'decision_cache'
+        })
+        return decision['url']
+    
+    # Construct search queries (title+year first, then the other variants)
+    queries = build_search_queries(movie_data, lang)
+    query = queries[0]
     
-    print(f"  Searching YouTube for: '{query}'")
+    if len(queries) > 1:
+        print(f"  Searching YouTube for: '{query}' (+{len(queries) - 1} variant(s))")
+    else:
+        print(f"  Searching YouTube for: '{query}'")
     
     try:
-        with YoutubeDL({
-            'quiet': True,
-            'extract_flat': False,
-            'default_search': 'ytsearch20',
-            'socket_timeout': 30,
-            'extractor_retries': 3,
-            'force_generic_extractor': True  # Added to help with URL extraction
-        }) as ydl:
-            result = ydl.extract_info(query, download=False)
-            
-            if not result or 'entries' not in result or not result['entries']:
-                print("⚠️ No YouTube videos found matching the query")
-                return None
-                
-            # Score all videos and find the best match
-            best_match = None
-            best_score = 0
-            
-            for video in result['entries']:
-                try:
-                    current_score = calculate_match_score(video, movie_data)
-                    if current_score > best_score:
-                        best_score = current_score
-                        best_match = video
-                except Exception as e:
-                    continue
+        if SEARCH_MODE == 'full':
+            ranked = rank_full_search(query, movie_data)
+        else:
+            ranked = rank_two_phase_search(queries, movie_data)
+        
+        if not ranked:
+            print("⚠️ No YouTube videos found matching the query")
+            return None
+        
+        best_score, best_match = ranked[0]
+        if best_score > 0:
+            print(f"\n🏆 Best Match Found:")
+            print(f"  Title: {best_match.get('title')}")
             
-            if best_match:
-                print(f"\n🏆 Best Match Found:")
-                print(f"  Title: {best_match.get('title')}")
+            url = video_url(best_match)
+            if url:
+                duration = best_match.get('duration') or 0
+                print(f"  URL: {url}")
+                print(f"  Duration: {int(duration)//60}m {int(duration)%60}s")
+                print(f"  Match Score: {best_score:.2f}/1.00")
                 
-                # Get the URL - trying multiple methods
-                url = best_match.get('url') or best_match.get('webpage_url')
-                if not url and best_match.get('id'):
-                    url = f"https://www.youtube.com/watch?v={best_match['id']}"
+                if best_score < 0.5:
+                    print("⚠️ Warning: Match quality is low, but will attempt download anyway")
                 
-                if url:
-                    print(f"  URL: {url}")
-                    print(f"  Duration: {best_match.get('duration', 0)//60}m {best_match.get('duration', 0)%60}s")
-                    print(f"  Match Score: {best_score:.2f}/1.00")
-                    
-                    if best_score < 0.5:
-                        print("⚠️ Warning: Match quality is low, but will attempt download anyway")
-                    
-                    return url
-                else:
-                    print("⚠️ Could not extract URL for best match")
-                    return None
+                report.update({
+                    'url': url,
+                    'title': best_match.get('title'),
+                    'duration': best_match.get('duration'),
+                    'score': round(best_score, 4),
+                    'source': 'search'
+                })
+                save_match_decision(movie_data, best_match, url)
+                return url
             else:
-                print("⚠️ No suitable matches found, trying first result")
-                first_video = result['entries'][0]
-                url = first_video.get('url') or first_video.get('webpage_url')
-                if not url and first_video.get('id'):
-                    url = f"https://www.youtube.com/watch?v={first_video['id']}"
-                return url if url else None
+                print("⚠️ Could not extract URL for best match")
+                return None
+        else:
+            print("⚠️ No suitable matches found, trying first result")
+            first_video = ranked[0][1]  # Ties keep search order, so this is the first result
+            url = video_url(first_video)
+            if url:
+                report.update({'url': url, 'title': first_video.get('title'), 'score': 0.0, 'source': 'first_result'})
+            return url if url else None
                 
     except Exception as e:
         print(f"⚠️ YouTube search failed, trying fallback method: {str(e)}")
         # Fallback to simple search
         try:
-            with YoutubeDL({
+            with load_yt_dlp().YoutubeDL({
                 'quiet': True,
                 'extract_flat': True,
                 'default_search': 'ytsearch1',
                 'force_generic_extractor': True
             }) as ydl:
-                result = ydl.extract_info(query, download=False)
+                result = youtube_call(ydl.extract_info, query, download=False)
                 if result and 'entries' in result and result['entries']:
                     video = result['entries'][0]
-                    url = video.get('url') or video.get('webpage_url')
-                    if not url and video.get('id'):
-                        url = f"https://www.youtube.com/watch?v={video['id']}"
+                    url = video_url(video)
+                    if url:
+                        report.update({'url': url, 'title': video.get('title'), 'score': 0.0, 'source': 'fallback'})
                     return url if url else None
         except Exception as e:
             print(f"⚠️ Fallback search also failed: {str(e)}")
@@ -266,15 +1451,216 @@ def search_youtube_full_movie(movie_data, lang='fr'):
         print("❌ Could not find any YouTube video")
         return None
 
+def video_url(video):
+    """Get a watch URL from a (flat or full) yt-dlp entry"""
+    if video.get('webpage_url'):
+        return video['webpage_url']
+    if video.get('url') and not video.get('formats') and not video.get('format_id'):
+        return video['url']  # Flat entry; in a full info dict `url` is the selected stream's expiring media URL
+    if video.get('id'):
+        return f"https://www.youtube.com/watch?v={video['id']}"
+    return None
+
+def keep_top_candidates(entries, movie_data, k):
+    """
+    Score entries in one batch and keep only the k best.
+
+    Returns (score, entry) pairs, best first; equal scores keep search order.
+    """
+    entries = list(entries)
+    heap = []
+    for index, (entry, score) in enumerate(zip(entries, score_candidates(entries, movie_data))):
+        if score is None:
+            continue
+        item = (score, -index, entry)  # -index breaks ties so entries are never compared
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [(score, entry) for score, _, entry in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+def rank_full_search(query, movie_data):
+    """Original search: fully resolve every result (all formats) before scoring"""
+    with load_yt_dlp().YoutubeDL({
+        'quiet': True,
+        'extract_flat': False,
+        'default_search': f'ytsearch{SEARCH_CANDIDATES}',
+        'socket_timeout': 30,
+        'extractor_retries': 3,
+        'force_generic_extractor': True  # Added to help with URL extraction
+    }) as ydl:
+        result = youtube_call(ydl.extract_info, query, download=False)
+    
+    if not result or not result.get('entries'):
+        return []
+    ranked = keep_top_candidates(result['entries'], movie_data, len(result['entries']))
+    
+    best_score, best_match = ranked[0]
+    if best_score > 0 and best_match.get('formats') and video_url(best_match):
+        # Full search results are complete info dicts: keep the winner for the download
+        remember_video_info(load_yt_dlp().YoutubeDL.sanitize_info(best_match, remove_private_keys=True), video_url(best_match))
+    return ranked
+
+def build_search_queries(movie_data, lang='fr'):
+    """Build the YouTube search queries for a movie from SEARCH_QUERY_VARIANTS, without duplicates"""
+    title = movie_data.get('title')
+    original_title = movie_data.get('original_title')
+    year = movie_data.get('year')
+    directors = movie_data.get('directors') or []
+    
+    variants = {
+        'title_year': YOUTUBE_SEARCH_TEMPLATE.format(title, year, " ".join(movie_data.get('genres', [])[:1])),
+        'original_year': YOUTUBE_SEARCH_TEMPLATE.format(original_title, year) if original_title and original_title != title else None,
+        'title_director': YOUTUBE_SEARCH_TEMPLATE.format(title, directors[0]) if directors else None,
+        'localized': f"{title} {year} {LOCALIZED_FULL_MOVIE[lang]}" if lang != 'en' and lang in LOCALIZED_FULL_MOVIE else None,
+    }
+    
+    queries = []
+    for name in ('title_year',) + tuple(v for v in SEARCH_QUERY_VARIANTS if v != 'title_year'):
+        query = variants.get(name)
+        if query and query not in queries:
+            queries.append(query)
+    return queries
+
+def list_youtube_candidates(query):
+    """Flat YouTube search: lightweight entries (id, title, duration, url) without any format extraction"""
+    with load_yt_dlp().YoutubeDL({
+        'quiet': True,
+        'extract_flat': 'in_playlist',
+        'socket_timeout': 30,
+        'extractor_retries': 3
+    }) as ydl, timed('search_listing', query=query):
+        result = youtube_call(ydl.extract_info, f"ytsearch{SEARCH_CANDIDATES}:{query}", download=False)
+    return (result or {}).get('entries') or []
+
+def rank_two_phase_search(queries, movie_data):
+    """
+    Two-phase search: list candidates flat (id, title, duration only), keep the
+    SEARCH_TOP_K best scores, then fully extract just those to verify them.
+
+    All query variants are listed concurrently and their results merged by
+    video ID. As soon as a candidate scores SEARCH_HIGH_CONFIDENCE, the
+    listings still running are not waited for. Verified info dicts land in
+    the extraction cache, so the download of the winner does not extract it
+    again.
+    """
+    candidates = []  # Deduplicated entries, in arrival order
+    scores = []
+    seen = set()
+    
+    executor = ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix='search')
+    try:
+        futures = {executor.submit(list_youtube_candidates, query): query for query in queries}
+        for future in as_completed(futures):
+            try:
+                entries = future.result()
+            except load_yt_dlp().DownloadError as e:
+                print(f"⚠️ Search variant failed: '{futures[future]}': {e}")
+                continue
+            
+            fresh = []
+            for entry in entries:
+                key = entry.get('id') or video_url(entry)
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(entry)
+            for entry, score in zip(fresh, score_candidates(fresh, movie_data)):
+                if score is not None:
+                    candidates.append(entry)
+                    scores.append(score)
+            
+            if scores and max(scores) >= SEARCH_HIGH_CONFIDENCE:
+                break  # Good enough: don't wait for the slower variants
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if not candidates and all(future.done() and future.exception() for future in futures):
+        raise load_yt_dlp().DownloadError("every search variant failed")
+    
+    best = heapq.nlargest(SEARCH_TOP_K, range(len(candidates)), key=lambda i: (scores[i], -i))
+    shortlist = [(scores[i], candidates[i]) for i in best]
+    if not shortlist:
+        return []
+    
+    def verify(candidate):
+        flat_score, entry = candidate
+        url = video_url(entry)
+        try:
+            info = extract_video_info(url)
+        except load_yt_dlp().DownloadError:
+            return None  # Removed, private or region-locked
+        return calculate_match_score(info, movie_data), info
+    
+    with ThreadPoolExecutor(max_workers=len(shortlist)) as executor:
+        verified = [v for v in executor.map(verify, shortlist) if v is not None]
+    if not verified:
+        return shortlist
+    return sorted(verified, key=lambda item: item[0], reverse=True)
+
+def compare_search_modes(movie_data, lang='fr'):
+    """Run the full and two-phase searches for one movie and report wall time and peak Python memory"""
+    import tracemalloc
+    
+    queries = build_search_queries(movie_data, lang)
+    
+    print(f"\n⏱️ Comparing search modes for: '{queries[0]}'")
+    for mode, rank in (('full', rank_full_search), ('two-phase', rank_two_phase_search)):
+        with _extraction_lock:
+            _extraction_cache.clear()  # Start each mode cold
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            ranked = rank(queries[0], movie_data) if mode == 'full' else rank(queries, movie_data)
+            outcome = f"best {ranked[0][0]:.2f} - {ranked[0][1].get('title')}" if ranked else "no results"
+        except Exception as e:
+            outcome = f"failed: {e}"
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {mode:<10} | {elapsed:6.2f}s | peak {peak / 1024 / 1024:7.1f} MiB | {outcome}")
+
+def probe_video_info(url):
+    """
+    Lightweight extraction for language checks.
+
+    Uses a cached full info dict when there is one. Otherwise it takes the
+    raw extractor result (no format selection or sorting, no HLS/DASH
+    manifests, no auto-translated captions), so a check costs one page
+    fetch. The result is trimmed to the fields the checks read and is not
+    put in the extraction cache, because downloads need the full dict.
+    """
+    info = cached_video_info(url)
+    if info is not None:
+        note_extraction_reused()
+    else:
+        opts = {
+            'quiet': True,
+            'skip_download': True,
+            'extractor_args': {'youtube': {'skip': ['hls', 'dash', 'translated_subs']}}
+        }
+        with timed('extract', url=url, probe=True), load_yt_dlp().YoutubeDL(opts) as ydl:
+            info = youtube_call(ydl.extract_info, url, download=False, process=False)
+        with _extraction_lock:
+            EXTRACTION_STATS['extractions'] += 1
+    
+    return {
+        'title': info.get('title'),
+        'webpage_url': info.get('webpage_url') or url,
+        'formats': [
+            {key: f.get(key) for key in ('format_id', 'acodec', 'vcodec', 'language', 'height')}
+            for f in info.get('formats') or []
+        ],
+        'subtitles': {lang: True for lang in info.get('subtitles') or {}},
+        'automatic_captions': {lang: True for lang in info.get('automatic_captions') or {}}
+    }
+
 def check_language_availability(url, lang='fr'):
     """Check if audio or subtitles are available in the specified language"""
     print(f"\n🔍 Checking language availability for {url}")
     print(f"🌍 Preferred Language: {lang}")
     
     try:
-        with YoutubeDL({'quiet': True, 'skip_download': True}) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
+        info = probe_video_info(url)
         formats = info.get('formats', [])
         subtitles = info.get('subtitles', {})
         
@@ -294,7 +1680,7 @@ def check_language_availability(url, lang='fr'):
             "title": info.get('title', 'Unknown')
         }
         
-    except DownloadError as e:
+    except load_yt_dlp().DownloadError as e:
         print(f"❌ Error checking language availability: {e}")
         return {
             "audio_available": False,
@@ -302,8 +1688,382 @@ def check_language_availability(url, lang='fr'):
             "error": str(e)
         }
 
-def download_youtube(url, lang='fr', mode='merged', verbose=False):
-    """Download YouTube video according to specified parameters"""
+def summarize_languages(info):
+    """Compact language coverage of a probed video: audio languages, subtitle languages and best video height"""
+    formats = info.get('formats') or []
+    heights = [f['height'] for f in formats if f.get('vcodec') != 'none' and f.get('height')]
+    return {
+        'title': info.get('title'),
+        'audio_langs': sorted({f['language'] for f in formats if f.get('acodec') != 'none' and f.get('language')}),
+        'manual_subs': sorted(info.get('subtitles') or {}),
+        'auto_subs': sorted(info.get('automatic_captions') or {}),
+        'best_height': max(heights, default=None)
+    }
+
+def remux_streams(video_file, audio_file, output_file, verbose=False):
+    """
+    Mux a video-only and an audio-only file into one MP4 without re-encoding.
+
+    ffmpeg copies the streams packet by packet, so memory use does not grow
+    with the movie length. The result is written to a temporary file and
+    renamed, so an interrupted remux never leaves a truncated output behind.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        print("⚠️ ffmpeg not found, cannot build the merged file locally")
+        return False
+    
+    temp_file = f"{output_file}.remux-tmp"  # Not '.part': yt-dlp would try to resume it
+    command = [
+        ffmpeg, '-y', '-loglevel', 'info' if verbose else 'error',
+        '-i', video_file, '-i', audio_file,
+        '-map', '0:v:0', '-map', '1:a:0',
+        '-c', 'copy', '-f', 'mp4', temp_file
+    ]
+    result = subprocess.run(command, stdout=None if verbose else subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        print(f"❌ Remux failed: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'ffmpeg error'}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
+    
+    os.replace(temp_file, output_file)
+    return True
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    video_id TEXT NOT NULL,
+    format_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (video_id, format_key)
+);
+CREATE TABLE IF NOT EXISTS links (
+    path TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    format_key TEXT NOT NULL,
+    linked_at REAL NOT NULL
+);
+"""
+
+_store_locks = {}  # (video_id, format_key) -> Lock, so one thread fetches while duplicates wait for the blob
+_store_locks_guard = threading.Lock()
+
+def store_lock(video_id, format_key):
+    """Lock serializing the download of one stored stream within this process"""
+    with _store_locks_guard:
+        return _store_locks.setdefault((video_id, format_key), threading.Lock())
+
+def store_blob_path(video_id, format_key, ext):
+    """Where a stream lives in the store: .store/<id[:2]>/<id>/<format_key><ext>"""
+    safe_id = re.sub(r'[^\w-]', '_', video_id)
+    return os.path.join(STORE_DIR, safe_id[:2], safe_id, re.sub(r'[^\w+-]', '_', format_key) + ext)
+
+def link_into_place(blob, path):
+    """Hardlink a blob to `path` (symlink when hardlinks are not possible), replacing whatever is there"""
+    temp_link = f"{path}.link-tmp"
+    if os.path.lexists(temp_link):
+        os.remove(temp_link)
+    try:
+        os.link(blob, temp_link)
+        kind = 'hardlink'
+    except OSError:  # Other filesystem, or no hardlink support
+        os.symlink(os.path.abspath(blob), temp_link)
+        kind = 'symlink'
+    os.replace(temp_link, path)
+    return kind
+
+def record_store_link(db, video_id, format_key, path):
+    db.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)", (os.path.abspath(path), video_id, format_key, time.time()))
+
+def store_link(video_id, format_key, path):
+    """
+    Materialize a stored stream at `path` without any transfer.
+
+    Returns the kind of link made ('hardlink' or 'symlink'), or None when
+    the stream is not in the store. A blob that vanished or changed size is
+    dropped from the index so the caller downloads it again.
+    """
+    with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+        row = db.execute("SELECT path, size FROM blobs WHERE video_id = ? AND format_key = ?", (video_id, format_key)).fetchone()
+        if row is None:
+            return None
+        if not os.path.isfile(row['path']) or os.path.getsize(row['path']) != row['size']:
+            db.execute("DELETE FROM blobs WHERE video_id = ? AND format_key = ?", (video_id, format_key))
+            return None
+        
+        if os.path.exists(path) and os.path.samefile(path, row['path']):
+            kind = 'symlink' if os.path.islink(path) else 'hardlink'
+        else:
+            kind = link_into_place(row['path'], path)
+        record_store_link(db, video_id, format_key, path)
+    return kind
+
+def store_has(video_id, format_key):
+    """True when a stream is in the store and its blob is intact (same size as when stored)"""
+    with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+        row = db.execute("SELECT path, size FROM blobs WHERE video_id = ? AND format_key = ?", (video_id, format_key)).fetchone()
+    return row is not None and os.path.isfile(row['path']) and os.path.getsize(row['path']) == row['size']
+
+def store_ingest(video_id, format_key, path):
+    """Add a freshly downloaded file to the store; `path` stays in place as a link to the blob"""
+    blob = os.path.abspath(store_blob_path(video_id, format_key, os.path.splitext(path)[1]))
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    if os.path.exists(blob):
+        link_into_place(blob, path)  # Stored by another process meanwhile: keep a single copy
+    else:
+        try:
+            os.link(path, blob)  # Same file under a second name: nothing is copied
+        except OSError:
+            shutil.move(path, blob)
+            link_into_place(blob, path)
+    
+    with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+        db.execute(
+            "INSERT INTO blobs VALUES (?, ?, ?, ?, NULL, ?) ON CONFLICT (video_id, format_key) DO NOTHING",
+            (video_id, format_key, blob, os.path.getsize(blob), time.time())
+        )
+        record_store_link(db, video_id, format_key, path)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(partial(f.read, 1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verify_store():
+    """
+    Check every blob of the store (presence, size, SHA-256) and every link.
+
+    The checksum is recorded on the first verification and compared on the
+    next ones. Damaged blobs are deleted along with the movie files hardlinked
+    to them, and dangling links are removed, so the next run downloads those
+    streams again. Returns counts of what was found.
+    """
+    counts = {'blobs': 0, 'ok': 0, 'missing': 0, 'damaged': 0, 'links_removed': 0}
+    with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+        blobs = [dict(row) for row in db.execute("SELECT * FROM blobs")]
+    
+    for blob in blobs:
+        counts['blobs'] += 1
+        key = (blob['video_id'], blob['format_key'])
+        if not os.path.isfile(blob['path']):
+            status = 'missing'
+        elif os.path.getsize(blob['path']) != blob['size']:
+            status = 'damaged'
+        else:
+            digest = file_sha256(blob['path'])
+            status = 'ok' if blob['sha256'] in (None, digest) else 'damaged'
+        counts[status] += 1
+        
+        with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+            if status == 'ok':
+                db.execute("UPDATE blobs SET sha256 = ? WHERE video_id = ? AND format_key = ?", (digest, *key))
+                continue
+            print(f"❌ Store: {blob['video_id']} {blob['format_key']} is {status}")
+            links = [row['path'] for row in db.execute("SELECT path FROM links WHERE video_id = ? AND format_key = ?", key)]
+            for link in links:
+                # Hardlinks share the damaged bytes; symlinks now dangle
+                if os.path.islink(link) or (status == 'damaged' and os.path.exists(link) and os.path.samefile(link, blob['path'])):
+                    os.remove(link)
+                    counts['links_removed'] += 1
+            if os.path.exists(blob['path']):
+                os.remove(blob['path'])
+            db.execute("DELETE FROM links WHERE video_id = ? AND format_key = ?", key)
+            db.execute("DELETE FROM blobs WHERE video_id = ? AND format_key = ?", key)
+    return counts
+
+def gc_store():
+    """
+    Delete blobs that no movie folder links to any more, and stray files.
+
+    A link counts while its path still refers to the blob (same inode for
+    hardlinks, same target for symlinks). Unindexed files younger than
+    STORE_ORPHAN_GRACE are kept, as another process may be ingesting them.
+    Returns (blobs deleted, bytes freed).
+    """
+    deleted, freed = 0, 0
+    with open_db(STORE_INDEX_FILE, STORE_SCHEMA) as db:
+        db.execute("BEGIN IMMEDIATE")  # No link may be added while we decide
+        blobs = {(row['video_id'], row['format_key']): row['path'] for row in db.execute("SELECT video_id, format_key, path FROM blobs")}
+        for row in db.execute("SELECT * FROM links").fetchall():
+            blob = blobs.get((row['video_id'], row['format_key']))
+            if not blob or not os.path.exists(row['path']) or not os.path.exists(blob) or not os.path.samefile(row['path'], blob):
+                db.execute("DELETE FROM links WHERE path = ?", (row['path'],))
+        
+        live = {(row['video_id'], row['format_key']) for row in db.execute("SELECT DISTINCT video_id, format_key FROM links")}
+        for key, path in blobs.items():
+            if key in live:
+                continue
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+            db.execute("DELETE FROM blobs WHERE video_id = ? AND format_key = ?", key)
+            deleted += 1
+        indexed = {os.path.abspath(path) for key, path in blobs.items() if key in live}
+    
+    for root, dirs, files in os.walk(STORE_DIR, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.abspath(path) not in indexed and time.time() - os.path.getmtime(path) > STORE_ORPHAN_GRACE:
+                freed += os.path.getsize(path)
+                os.remove(path)
+                deleted += 1
+        if root != STORE_DIR and not os.listdir(root):
+            os.rmdir(root)
+    return deleted, freed
+
+def claim_download_dir(title, video_id):
+    """
+    Per-movie folder for a video. The folder records its video ID, so a
+    different video whose title sanitizes to the same name (titles are cut
+    to 40 characters) gets '<name>_<video_id>' instead of overwriting it.
+    Folders from before the marker existed are claimed by the first video.
+    """
+    clean_name = sanitize_filename(title) or 'video'
+    for name in (clean_name, f"{clean_name}_{video_id}"):
+        download_dir = os.path.join(BASE_DIR, name)
+        os.makedirs(download_dir, exist_ok=True)
+        marker = os.path.join(download_dir, '.video_id')
+        try:
+            with open(marker, 'x', encoding='utf-8') as f:
+                f.write(video_id)
+            return download_dir
+        except FileExistsError:
+            with open(marker, encoding='utf-8') as f:
+                if f.read().strip() == video_id:
+                    return download_dir
+    return download_dir
+
+def parse_byte_size(text):
+    """Parse '500K', '8M', '1.5G' or a plain number of bytes"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)i?B?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"invalid size: {text}")
+    return int(float(match.group(1)) * 1024 ** ' KMGT'.index(match.group(2).upper() or ' '))
+
+def expected_stream_size(fmt, duration):
+    """Bytes a selected format should take: its filesize, the approximation, or bitrate x duration"""
+    if not fmt:
+        return 0
+    return fmt.get('filesize') or fmt.get('filesize_approx') or int((fmt.get('tbr') or 0) * 1000 / 8 * (duration or 0))
+
+def reserved_bytes():
+    """Disk space the running jobs still expect to write (caller holds _scheduler_cond)"""
+    return sum(max(0, job['expected'] - job['written']) for job in _download_jobs['active'])
+
+def scheduler_snapshot():
+    """Queue depth, running jobs and reserved bytes of the download scheduler"""
+    with _scheduler_cond:
+        return {
+            'waiting': len(_download_jobs['waiting']),
+            'active': len(_download_jobs['active']),
+            'reserved_bytes': reserved_bytes()
+        }
+
+def rebalance_bandwidth():
+    """
+    Split BANDWIDTH_LIMIT across the jobs that are transferring, by priority
+    weight, then evenly across each job's open yt-dlp instances. For plain
+    HTTP streams yt-dlp reads `ratelimit` from its params on every chunk, so
+    new shares apply at once. Fragmented (DASH/HLS) streams copy the params
+    when they start and keep that share until they finish (caller holds
+    _scheduler_cond).
+    """
+    transferring = [job for job in _download_jobs['active'] if job['params']]
+    total_weight = sum(PRIORITY_WEIGHTS[job['priority']] for job in transferring)
+    for job in transferring:
+        share = None
+        if BANDWIDTH_LIMIT:
+            share = max(1, int(BANDWIDTH_LIMIT * PRIORITY_WEIGHTS[job['priority']] / total_weight / len(job['params'])))
+        for params in job['params']:
+            params['ratelimit'] = share
+
+@contextmanager
+def download_slot(label, expected_bytes, priority='normal', linked_only=False):
+    """
+    Admission control for one download job.
+
+    Jobs start in priority order (arrival order within a class) once the
+    disk holding BASE_DIR has room for `expected_bytes` on top of what the
+    running jobs still have to write, plus DISK_HEADROOM. Yields the job
+    (for `track_download_params` and `make_progress_hook`), or None when it
+    can never fit: nothing else is running and the disk is still too full.
+    `linked_only` jobs (every stream already on disk or in the store, so
+    only links and subtitles are written) start at once.
+    """
+    job = {'label': label, 'priority': priority, 'expected': expected_bytes, 'written': 0,
+           'params': [], 'sequence': next(_job_sequence)}
+    admitted = False
+    with _scheduler_cond:
+        _download_jobs['waiting'].append(job)
+        try:
+            announced = False
+            while True:
+                if linked_only:
+                    admitted = True
+                    break
+                head = min(_download_jobs['waiting'], key=lambda j: (-PRIORITY_WEIGHTS[j['priority']], j['sequence']))
+                if head is job:
+                    room = shutil.disk_usage(BASE_DIR).free - DISK_HEADROOM - reserved_bytes()
+                    if expected_bytes <= room:
+                        admitted = True
+                        break
+                    if not _download_jobs['active']:
+                        print(f"❌ Not enough disk space for {label}: needs {expected_bytes / 1024 ** 3:.1f} GiB, {max(room, 0) / 1024 ** 3:.1f} GiB available")
+                        break
+                if not announced:
+                    print(f"⏳ {label} queued ({len(_download_jobs['waiting'])} waiting, {len(_download_jobs['active'])} running)")
+                    announced = True
+                _scheduler_cond.wait(ADMISSION_POLL)
+        finally:
+            _download_jobs['waiting'].remove(job)
+            if admitted:
+                _download_jobs['active'].append(job)
+            _scheduler_cond.notify_all()  # The head of the queue changed
+    
+    if not admitted:
+        yield None
+        return
+    try:
+        yield job
+    finally:
+        with _scheduler_cond:
+            _download_jobs['active'].remove(job)
+            rebalance_bandwidth()
+            _scheduler_cond.notify_all()
+
+@contextmanager
+def track_download_params(job, params):
+    """Let the scheduler steer the `ratelimit` of one yt-dlp instance while it downloads"""
+    if job is None:
+        yield
+        return
+    if BANDWIDTH_LIMIT:
+        # Every concurrent fragment thread rate-limits on its own: with N of them a stream would take N times its share
+        params['concurrent_fragment_downloads'] = 1
+    with _scheduler_cond:
+        job['params'].append(params)
+        rebalance_bandwidth()
+    try:
+        yield
+    finally:
+        with _scheduler_cond:
+            job['params'].remove(params)
+            rebalance_bandwidth()
+
+def download_youtube(url, lang='fr', mode='merged', verbose=False, report=None, priority='normal'):
+    """
+    Download YouTube video according to specified parameters.
+
+    If a `report` dict is given, it is filled with the selected formats
+    and the files written, so batch callers can record what happened.
+    """
+    if report is None:
+        report = {}
     if not url:
         print("❌ No valid URL provided for download")
         return False
@@ -315,20 +2075,19 @@ def download_youtube(url, lang='fr', mode='merged', verbose=False):
     if mode == 'check':
         return check_language_availability(url, lang)
     
-    base_dir = "Youtube_Bot_Downloads"
+    base_dir = BASE_DIR
     os.makedirs(base_dir, exist_ok=True)
     
     try:
-        with YoutubeDL({'quiet': not verbose, 'skip_download': True}) as ydl:
-            info = ydl.extract_info(url, download=False)
-    except DownloadError as e:
+        info = extract_video_info(url, verbose)
+    except load_yt_dlp().DownloadError as e:
         print(f"❌ Error extracting video info: {e}")
         return False
     
     title = info.get('title', 'video')
-    clean_name = sanitize_filename(title)
-    download_dir = os.path.join(base_dir, clean_name)
-    os.makedirs(download_dir, exist_ok=True)
+    video_id = info.get('id') or sanitize_filename(url)
+    download_dir = claim_download_dir(title, video_id)
+    clean_name = os.path.basename(download_dir)
     
     duration = info.get('duration', 0)
     formats = info.get('formats', [])
@@ -375,102 +2134,217 @@ def download_youtube(url, lang='fr', mode='merged', verbose=False):
     video_file = f"{base_file}_video.{video_ext}"
     audio_file = f"{base_file}_audio_{audio_lang}.{audio_ext}"
     
+    report.update({
+        'title': title,
+        'download_dir': download_dir,
+        'video_fmt': video_fmt,
+        'audio_fmt': audio_fmt,
+        'outputs': []
+    })
+    
     print(f"\n📊 Stream Selection:")
     print(f"  • Video: {video_fmt} ({best_video['height']}p)" if best_video else "  • Video: best available")
     print(f"  • Audio: {audio_fmt} (Language: {audio_lang})" if audio_stream else "  • Audio: best available")
     
     download_success = False
+    merged_key = best_video and audio_stream and f"{video_fmt}+{audio_fmt}"  # Remuxed and downloaded merges are interchangeable
+    
+    trace_movie = getattr(_trace_context, 'movie_id', None)
     
     def run_download(opts):
+        set_trace_movie(trace_movie)  # Stream downloads may run in pool threads
+        label = os.path.basename(opts['outtmpl'])
+        opts = dict(opts, progress_hooks=[make_progress_hook(label, job)])
+        
+        # Reuse the info dict extracted above instead of letting yt-dlp re-extract the page
+        try:
+            with timed('download', file=label), load_yt_dlp().YoutubeDL(opts) as ydl, track_download_params(job, ydl.params):
+                ydl.process_ie_result(copy.deepcopy(info), download=True)
+            note_extraction_reused()
+            return True
+        except Exception as e:
+            if verbose:
+                print(f"⚠️ Cached video info failed ({e}), extracting again")
+            forget_video_info(url)
+        
         try:
-            with YoutubeDL(opts) as ydl:
-                ydl.download([url])
+            with timed('download', file=label, reextracted=True), load_yt_dlp().YoutubeDL(opts) as ydl, track_download_params(job, ydl.params):
+                youtube_call(ydl.download, [url])
             return True
-        except DownloadError as e:
+        except load_yt_dlp().DownloadError as e:
             print(f"❌ Download failed: {e}")
             return False
     
-    if mode in ['separate', 'both']:
-        print("\n🔽 Downloading separate video and audio streams...")
-        
-        video_opts = {
-            'outtmpl': video_file,
-            'format': f'{video_fmt}/bestvideo',
-            'quiet': not verbose,
-            'progress': verbose,
-            'postprocessors': [],
-            'writesubtitles': False,
-            'socket_timeout': 120,
-            'retries': 10,
-            'fragment_retries': 10,
-            'extractor_retries': 5
-        }
-        
-        video_success = run_download(video_opts)
-        if video_success:
-            print(f"✅ Video stream saved: {os.path.basename(video_file)}")
-        
-        audio_opts = {
-            'outtmpl': audio_file,
-            'format': f'{audio_fmt}/bestaudio',
-            'quiet': not verbose,
-            'progress': verbose,
-            'postprocessors': [],
-            'writesubtitles': False
-        }
+    def via_store(format_key, path, fetch, on_link=None):
+        """
+        Link `path` from the store when this exact stream was downloaded
+        before (for this or any other movie), otherwise fetch it and store it.
+        Streams without a concrete format ID bypass the store.
+        """
+        if not STORE_ENABLED or not format_key:
+            return fetch()
+        with store_lock(video_id, format_key):
+            kind = store_link(video_id, format_key, path)
+            if kind:
+                print(f"♻️ {os.path.basename(path)} {kind}ed from the store, nothing downloaded")
+                if on_link:
+                    on_link()
+                return True
+            if not fetch():
+                return False
+            if os.path.isfile(path):
+                store_ingest(video_id, format_key, path)
+            return True
+    
+    def already_there(format_key, path):
+        """True when a file needs no transfer: already on disk, or linkable from the store"""
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            return True
+        return bool(STORE_ENABLED and format_key and store_has(video_id, format_key))
+    
+    # Only what will actually be transferred counts against the disk (links to stored blobs take no space)
+    needed = {
+        'video': not already_there(best_video and video_fmt, video_file),
+        'audio': not already_there(audio_stream and audio_fmt, audio_file),
+        'merged': not already_there(merged_key, merged_file),
+    }
+    video_bytes = expected_stream_size(best_video, duration) if needed['video'] else 0
+    audio_bytes = expected_stream_size(audio_stream, duration) if needed['audio'] else 0
+    merged_bytes = expected_stream_size(best_video, duration) + expected_stream_size(audio_stream, duration) if needed['merged'] else 0
+    if mode == 'merged':
+        expected_bytes = 2 * merged_bytes  # Streams and the merged file are on disk together until the merge ends
+        linked_only = not needed['merged']
+    elif mode == 'remux':
+        expected_bytes = video_bytes + audio_bytes + merged_bytes
+        linked_only = not any(needed.values())
+    else:
+        expected_bytes = video_bytes + audio_bytes
+        linked_only = not (needed['video'] or needed['audio'])
+    with download_slot(f"{title} ({mode})", expected_bytes, priority, linked_only) as job:
+        if job is None:
+            return False
         
-        audio_success = run_download(audio_opts)
-        if audio_success:
-            print(f"✅ Audio stream saved: {os.path.basename(audio_file)}")
+        if mode in ['separate', 'both', 'remux']:
+            print("\n🔽 Downloading separate video and audio streams...")
+            
+            video_opts = {
+                'outtmpl': video_file,
+                'format': f'{video_fmt}/bestvideo',
+                'quiet': not verbose,
+                'progress': verbose,
+                'postprocessors': [],
+                'writesubtitles': False,
+                'socket_timeout': 120,
+                'retries': 10,
+                'fragment_retries': 10,
+                'extractor_retries': 5,
+                'concurrent_fragment_downloads': FRAGMENT_WORKERS
+            }
+            
+            audio_opts = {
+                'outtmpl': audio_file,
+                'format': f'{audio_fmt}/bestaudio',
+                'quiet': not verbose,
+                'progress': verbose,
+                'postprocessors': [],
+                'writesubtitles': False,
+                'concurrent_fragment_downloads': FRAGMENT_WORKERS
+            }
+            
+            subtitle_opts = {
+                'outtmpl': f"{base_file}",
+                'skip_download': True,
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': [lang, 'en'],
+                'quiet': not verbose,
+                'progress': verbose
+            }
+            
+            streams = [
+                ('video', video_opts, video_file, f"✅ Video stream saved: {os.path.basename(video_file)}"),
+                ('audio', audio_opts, audio_file, f"✅ Audio stream saved: {os.path.basename(audio_file)}"),
+                ('subtitles', subtitle_opts, None, "✅ Subtitles downloaded (if available)"),
+            ]
+            store_keys = {
+                'video': best_video and video_fmt,
+                'audio': audio_stream and audio_fmt
+            }
+            
+            # Streams already on disk (earlier run, partial 'both' run) are not fetched again
+            on_disk = {name for name, _, path, _ in streams if path and os.path.isfile(path) and os.path.getsize(path) > 0}
+            for name in on_disk:
+                print(f"♻️ {name.capitalize()} stream already on disk, skipping download")
+            
+            # Independent files: audio and subtitles overlap with the much longer video transfer
+            with ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix='stream') as executor:
+                futures = [
+                    (name, executor.submit(via_store, store_keys.get(name), path, partial(run_download, opts)))
+                    for name, opts, path, _ in streams if name not in on_disk
+                ]
+            stream_results = {name: True for name in on_disk}
+            stream_results.update((name, future.result()) for name, future in futures)
+            stream_results = {name: stream_results[name] for name, _, _, _ in streams}
+            
+            for name, _, path, message in streams:
+                if stream_results[name] and name not in on_disk:
+                    print(message)
+                if stream_results[name] and path:
+                    report['outputs'].append(path)
+            print("📊 Streams: " + " | ".join(f"{name} {'✅' if ok else '❌'}" for name, ok in stream_results.items()))
+            report['streams'] = stream_results
+            
+            download_success = stream_results['video'] or stream_results['audio']
         
-        subtitle_opts = {
-            'outtmpl': f"{base_file}",
-            'skip_download': True,
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitleslangs': [lang, 'en'],
-            'quiet': not verbose,
-            'progress': verbose
-        }
+        remuxed = False
+        if mode == 'remux':
+            if stream_results['video'] and stream_results['audio']:
+                print("\n🎞️ Building merged file from the streams on disk (stream copy)...")
+                remuxed = via_store(merged_key, merged_file, partial(remux_streams, video_file, audio_file, merged_file, verbose))
+                if remuxed:
+                    report['outputs'].append(merged_file)
+                    print(f"✅ Merged video+audio saved: {os.path.basename(merged_file)} (no second download)")
         
-        subtitle_success = run_download(subtitle_opts)
-        if subtitle_success:
-            print(f"✅ Subtitles downloaded (if available)")
+        if mode == 'merged' or (mode == 'both' and not download_success) or (mode == 'remux' and not remuxed):
+            if mode == 'both' and not download_success:
+                print("\n🔁 Fallback: Downloading merged file since separate streams failed...")
+            elif mode == 'remux':
+                print("\n🔁 Fallback: Downloading merged file since it could not be built locally...")
+            else:
+                print("\n🔽 Downloading merged video+audio file...")
+            
+            merge_opts = {
+                'outtmpl': merged_file,
+                'format': f'{video_fmt}+{audio_fmt}/best',
+                'merge_output_format': 'mp4',
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': [lang, 'en'],
+                'quiet': not verbose,
+                'progress': verbose,
+                'concurrent_fragment_downloads': FRAGMENT_WORKERS
+            }
+            
+            # A stored merged file still needs this run's subtitles next to it
+            subtitles_only = dict(merge_opts, skip_download=True)
+            merged_success = via_store(merged_key, merged_file, partial(run_download, merge_opts),
+                                       on_link=partial(run_download, subtitles_only))
+            
+            if merged_success:
+                report['outputs'].append(merged_file)
+                print(f"✅ Merged video+audio saved: {os.path.basename(merged_file)}")
+                download_success = True
         
-        download_success = video_success or audio_success
-    
-    if mode == 'merged' or (mode == 'both' and not download_success):
-        if mode == 'both' and not download_success:
-            print("\n🔁 Fallback: Downloading merged file since separate streams failed...")
+        if download_success:
+            print(f"\n📁 All output saved to: {download_dir}")
+            return True
         else:
-            print("\n🔽 Downloading merged video+audio file...")
-        
-        merge_opts = {
-            'outtmpl': merged_file,
-            'format': f'{video_fmt}+{audio_fmt}/best',
-            'merge_output_format': 'mp4',
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitleslangs': [lang, 'en'],
-            'quiet': not verbose,
-            'progress': verbose
-        }
-        
-        merged_success = run_download(merge_opts)
-        
-        if merged_success:
-            print(f"✅ Merged video+audio saved: {os.path.basename(merged_file)}")
-            download_success = True
-    
-    if download_success:
-        print(f"\n📁 All output saved to: {download_dir}")
-        return True
-    else:
-        print("\n❌ Download failed completely.")
-        return False
+            print("\n❌ Download failed completely.")
+            return False
 
-def process_movie(movie_id, lang='fr', mode='merged', verbose=False):
+def process_movie(movie_id, lang='fr', mode='merged', verbose=False, priority='normal'):
     """Main function to process a movie from TMDB ID to YouTube download"""
+    set_trace_movie(movie_id)
     try:
         movie_data = get_tmdb_movie_details(movie_id)
         if movie_data.get('status') == 'error':
@@ -484,7 +2358,10 @@ def process_movie(movie_id, lang='fr', mode='merged', verbose=False):
             print("❌ No suitable video found for download")
             return False
         
-        return download_youtube(youtube_url, lang, mode, verbose)
+        success = download_youtube(youtube_url, lang, mode, verbose, priority=priority)
+        print_extraction_stats()
+        print_rate_limit_stats()
+        return success
         
     except Exception as e:
         print(f"❌ Unexpected error processing movie: {str(e)}")
@@ -493,19 +2370,860 @@ def process_movie(movie_id, lang='fr', mode='merged', verbose=False):
             traceback.print_exc()
         return False
 
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    movie_id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    title TEXT,
+    url TEXT,
+    score REAL,
+    video_fmt TEXT,
+    audio_fmt TEXT,
+    download_dir TEXT,
+    outputs TEXT,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL,
+    next_attempt_at REAL,
+    updated_at REAL NOT NULL
+);
+"""
+
+def journal_owner_alive(owner):
+    """Tell whether the worker holding a job lease may still be running"""
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # Another machine: only the lease expiry can tell
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def journal_claim(movie_id):
+    """
+    Atomically take ownership of a movie in the job journal.
+
+    Returns (job, None) where job is the previous journal state (empty dict
+    for a new movie), or (None, reason) when the movie must be skipped:
+    already done, leased by a live worker, waiting for its retry backoff,
+    or out of attempts.
+    """
+    now = time.time()
+    with open_db(JOURNAL_FILE, JOURNAL_SCHEMA) as db:
+        db.execute("BEGIN IMMEDIATE")  # Serialize claims across threads and processes
+        row = db.execute("SELECT * FROM jobs WHERE movie_id = ?", (movie_id,)).fetchone()
+        job = dict(row) if row else {}
+        
+        if job.get('status') == 'done':
+            return None, "already done"
+        if job.get('status') == 'running' and job['lease_until'] > now:
+            if job['owner'] != JOURNAL_OWNER and journal_owner_alive(job['owner']):
+                return None, f"in progress on {job['owner']}"
+            if job['owner'] == JOURNAL_OWNER and movie_id in _journal_claims:
+                return None, "in progress in another worker thread"
+            # Our owner name but not our claim: left behind by an earlier process that had the same PID
+        if job.get('status') == 'failed':
+            if job['attempts'] >= JOURNAL_MAX_ATTEMPTS:
+                return None, f"gave up after {job['attempts']} attempts: {job['error']}"
+            if job['next_attempt_at'] > now:
+                return None, f"retry backoff ({int(job['next_attempt_at'] - now)}s left)"
+        
+        db.execute(
+            "INSERT INTO jobs (movie_id, stage, status, attempts, owner, lease_until, updated_at) "
+            "VALUES (?, 'metadata', 'running', 1, ?, ?, ?) "
+            "ON CONFLICT (movie_id) DO UPDATE SET status = 'running', attempts = attempts + 1, "
+            "owner = excluded.owner, lease_until = excluded.lease_until, updated_at = excluded.updated_at",
+            (movie_id, JOURNAL_OWNER, now + JOURNAL_LEASE, now)
+        )
+        _journal_claims.add(movie_id)
+    return job, None
+
+def journal_update(movie_id, **fields):
+    """Record progress for a claimed movie (stage, url, score, ...) and renew its lease"""
+    now = time.time()
+    fields.update({'lease_until': now + JOURNAL_LEASE, 'updated_at': now})
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with open_db(JOURNAL_FILE, JOURNAL_SCHEMA) as db:
+        db.execute(f"UPDATE jobs SET {assignments} WHERE movie_id = ? AND owner = ?",
+                   (*fields.values(), movie_id, JOURNAL_OWNER))
+
+def journal_finish(movie_id, success, error=None, details=None):
+    """Mark a claimed movie done, or failed with an exponential retry backoff"""
+    details = details or {}
+    fields = {
+        'status': 'done' if success else 'failed',
+        'error': None if success else error,
+        'lease_until': None
+    }
+    if success:
+        fields['stage'] = 'done'
+    else:
+        # Search again on the retry: the chosen video may be gone, private or region-locked.
+        # Only a crash mid-download (row left 'running') goes straight back to the download.
+        fields.update(stage='search', url=None, score=None)
+    for key in ('title', 'video_fmt', 'audio_fmt', 'download_dir'):
+        if details.get(key):
+            fields[key] = details[key]
+    if details.get('outputs'):
+        fields['outputs'] = json.dumps(details['outputs'], ensure_ascii=False)
+    
+    now = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with open_db(JOURNAL_FILE, JOURNAL_SCHEMA) as db:
+        db.execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ?, "
+            "next_attempt_at = ? + MIN(?, ? * (1 << MAX(attempts - 1, 0))) "
+            "WHERE movie_id = ? AND owner = ?",
+            (*fields.values(), now, now, JOURNAL_BACKOFF_MAX, JOURNAL_BACKOFF_BASE, movie_id, JOURNAL_OWNER)
+        )
+    _journal_claims.discard(movie_id)
+
+def read_movie_ids(source):
+    """Yield TMDB movie IDs (or URLs for --audit) from a file (one per line, '#' comments allowed) or stdin when source is '-'"""
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in stream:
+            for movie_id in re.split(r'[\s,]+', line.split('#', 1)[0]):
+                if movie_id:
+                    yield movie_id
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+_STOP = object()  # Sentinel telling a stage worker that its input is exhausted
+
+def run_batch(movie_ids, lang='fr', mode='merged', verbose=False,
+              metadata_workers=METADATA_WORKERS, search_workers=SEARCH_WORKERS,
+              download_workers=DOWNLOAD_WORKERS, queue_size=STAGE_QUEUE_SIZE,
+              results_file=BATCH_RESULTS_FILE, priority='normal', on_result=None):
+    """
+    Process many TMDB IDs through a staged pipeline:
+    metadata pool -> search pool -> download pool.
+
+    Each stage has its own worker pool and the stages are connected by
+    bounded queues, so a slow stage (usually the downloads) holds back the
+    faster ones instead of piling up work in memory. Every movie ID ends up
+    as exactly one JSON line in `results_file`.
+    
+    `movie_ids` may also yield {'movie_id': ..., 'movie_data': ...} records
+    (see iter_tmdb_catalogue); details already fetched are not fetched again.
+    `on_result` is called with every result line once it is written, except
+    for movies written off because the batch was aborted.
+    """
+    os.makedirs(os.path.dirname(results_file) or '.', exist_ok=True)
+    
+    id_queue = queue.Queue(maxsize=queue_size)
+    search_queue = queue.Queue(maxsize=queue_size)
+    download_queue = queue.Queue(maxsize=queue_size)
+    results_lock = threading.Lock()
+    aborted = threading.Event()  # Set when feeding fails: queued movies are skipped, not processed
+    counts = {'success': 0, 'error': 0, 'skipped': 0}
+    results = open(results_file, 'a', encoding='utf-8')
+    
+    def finish(record, status, stage, message=None, processed=True):
+        """
+        Write the final result line for one movie (private '_' keys are dropped).
+
+        Never raises: a worker that died here (disk full, database locked)
+        would leave the stage before it blocked forever on a full queue.
+        """
+        summary = {k: v for k, v in record.items() if not k.startswith('_')}
+        summary.update({
+            'status': status,
+            'stage': stage,
+            'elapsed': round(time.time() - record['_started'], 2)
+        })
+        if message:
+            summary['message'] = message
+        if JOURNAL_FILE and status != 'skipped':
+            try:
+                journal_finish(record['movie_id'], status == 'success', message, record.get('download'))
+            except Exception as e:
+                print(f"⚠️ Could not record {record['movie_id']} in the journal: {e}")
+        with results_lock:
+            counts[status] += 1
+            try:
+                results.write(json.dumps(summary, ensure_ascii=False) + '\n')
+                results.flush()
+            except Exception as e:
+                print(f"⚠️ Could not write the result of {record['movie_id']}: {e}")
+        if on_result and processed:
+            try:
+                on_result(summary)
+            except Exception as e:
+                print(f"⚠️ Result callback failed for {record['movie_id']}: {e}")
+    
+    def fetch_metadata(record):
+        set_trace_movie(record['movie_id'])
+        if JOURNAL_FILE:
+            job, reason = journal_claim(record['movie_id'])
+            if job is None:
+                print(f"⏭️ Skipping {record['movie_id']}: {reason}")
+                return finish(record, 'skipped', 'journal', reason)
+            if job.get('status') == 'running' and job.get('url') and job.get('stage') == 'download':
+                # Crashed during the download: go straight back to it (yt-dlp resumes .part files)
+                print(f"⏩ Resuming {record['movie_id']} at the download stage")
+                record.update({'title': job['title'], 'resumed': True})
+                record['match'] = {'url': job['url'], 'score': job['score'], 'source': 'journal'}
+                return record
+        
+        movie_data = record.get('_movie_data') or get_tmdb_movie_details(record['movie_id'])
+        if movie_data.get('status') == 'error':
+            return finish(record, 'error', 'metadata', movie_data.get('message'))
+        record['title'] = movie_data.get('title')
+        record['year'] = movie_data.get('year')
+        record['_movie_data'] = movie_data
+        if JOURNAL_FILE:
+            journal_update(record['movie_id'], stage='search', title=record['title'])
+        return record
+    
+    def search(record):
+        set_trace_movie(record['movie_id'])
+        if record.get('match'):
+            return record  # Resumed from the journal
+        match = {}
+        url = search_youtube_full_movie(record['_movie_data'], lang, report=match)
+        if not url:
+            return finish(record, 'error', 'search', 'No suitable video found')
+        record['match'] = match
+        if JOURNAL_FILE:
+            journal_update(record['movie_id'], stage='download', url=url, score=match.get('score'))
+        return record
+    
+    def download(record):
+        set_trace_movie(record['movie_id'])
+        details = {}
+        outcome = download_youtube(record['match']['url'], lang, mode, verbose, report=details, priority=priority)
+        if details:
+            record['download'] = details
+        if isinstance(outcome, dict):  # check mode returns language availability
+            record['languages'] = outcome
+            outcome = 'error' not in outcome
+        return finish(record, 'success' if outcome else 'error', 'download',
+                      None if outcome else 'Download failed')
+    
+    def stage_worker(stage, inbox, outbox, handler):
+        while True:
+            record = inbox.get()
+            if record is _STOP:
+                return
+            if aborted.is_set():
+                finish(record, 'skipped', stage, 'Batch aborted', processed=False)
+                continue
+            try:
+                record = handler(record)
+            except Exception as e:
+                finish(record, 'error', stage, f"Unexpected error: {e}")
+                continue
+            if record is not None and outbox is not None:
+                outbox.put(record)  # Blocks while the next stage is saturated
+    
+    stages = [
+        ('metadata', id_queue, search_queue, fetch_metadata, metadata_workers),
+        ('search', search_queue, download_queue, search, search_workers),
+        ('download', download_queue, None, download, download_workers),
+    ]
+    pools = [
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{stage}-worker")
+        for stage, _, _, _, workers in stages
+    ]
+    
+    worker_error = None  # First unexpected worker failure, raised once every pool is shut down
+    print(f"\n📦 Batch mode: {metadata_workers} metadata / {search_workers} search / {download_workers} download workers")
+    started = time.time()
+    try:
+        workers_per_stage = [
+            [pool.submit(stage_worker, stage, inbox, outbox, handler) for _ in range(workers)]
+            for pool, (stage, inbox, outbox, handler, workers) in zip(pools, stages)
+        ]
+        
+        try:
+            for item in movie_ids:
+                if isinstance(item, dict):  # Catalogue record, possibly with its details prefetched
+                    id_queue.put({'movie_id': item['movie_id'], '_movie_data': item.get('movie_data'), '_started': time.time()})
+                else:
+                    id_queue.put({'movie_id': item, '_started': time.time()})
+        except BaseException:
+            # Unreadable input, Ctrl+C, TMDB error while paging: wind every stage down, then re-raise
+            aborted.set()
+            raise
+        finally:
+            for _ in range(metadata_workers):
+                id_queue.put(_STOP)
+            
+            # Once a stage has drained, stop the workers of the stage after it (even if one of them failed)
+            for i, futures in enumerate(workers_per_stage):
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        worker_error = worker_error or e
+                if i + 1 < len(stages):
+                    _, inbox, _, _, next_workers = stages[i + 1]
+                    for _ in range(next_workers):
+                        inbox.put(_STOP)
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+        results.close()
+    if worker_error is not None:
+        raise worker_error
+    
+    elapsed = time.time() - started
+    print(f"\n📦 Batch finished in {elapsed:.1f}s: {counts['success']} succeeded, {counts['error']} failed, {counts['skipped']} skipped")
+    print(f"📄 Results written to: {results_file}")
+    print_extraction_stats()
+    print_rate_limit_stats()
+    return counts
+
+def audited_inputs(output_file):
+    """Inputs that already have an error-free row in an audit table (JSONL or CSV), so a rerun skips them"""
+    if not os.path.exists(output_file):
+        return set()
+    done = set()
+    with open(output_file, encoding='utf-8', newline='') as f:
+        if output_file.endswith('.csv'):
+            for row in csv.DictReader(f):
+                if row.get('input') and row.get('error') == '':  # None: row cut short by an interrupted run
+                    done.add(row['input'])
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Blank, or truncated by an interrupted run
+                if row.get('input') and not row.get('error'):
+                    done.add(row['input'])
+    return done
+
+def audit_languages(item, lang='fr'):
+    """
+    One audit row for a YouTube URL or a TMDB ID.
+
+    TMDB IDs are resolved to a URL with the regular metadata + search path
+    (so decision-cache hits cost no search), then the video is probed with
+    the lightweight check extraction.
+    """
+    row = dict.fromkeys(AUDIT_COLUMNS)
+    row['input'] = item
+    url = item
+    if not re.match(r'https?://', item):
+        set_trace_movie(item)
+        movie_data = get_tmdb_movie_details(item, quiet=True)
+        if movie_data.get('status') == 'error':
+            row['error'] = movie_data.get('message') or 'TMDB lookup failed'
+            return row
+        url = search_youtube_full_movie(movie_data, lang)
+        if not url:
+            row.update({'title': movie_data.get('title'), 'error': 'No suitable video found'})
+            return row
+    
+    row['url'] = url
+    try:
+        row.update(summarize_languages(probe_video_info(url)))
+    except load_yt_dlp().DownloadError as e:
+        row['error'] = str(e)
+    return row
+
+def run_language_audit(items, lang='fr', output_file=AUDIT_OUTPUT_FILE, workers=AUDIT_WORKERS):
+    """
+    Probe many URLs / TMDB IDs concurrently and append one row per input to
+    `output_file` (JSONL, or CSV when it ends in '.csv').
+
+    Rows are flushed as soon as each probe finishes, and inputs that already
+    have an error-free row are skipped, so an interrupted audit resumes where
+    it stopped. Inputs that failed are retried; the newest row wins.
+    """
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    seen = audited_inputs(output_file)
+    as_csv = output_file.endswith('.csv')
+    new_file = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    if not new_file:
+        with open(output_file, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b'\n'  # An interrupted run left a partial row: start ours on a new line
+    counts = {'audited': 0, 'error': 0, 'skipped': 0, 'audio': 0, 'subs': 0}
+    
+    print(f"\n🔍 Language audit: {workers} workers, {len(seen)} input(s) already done, writing to {output_file}")
+    started = time.time()
+    with open(output_file, 'a', encoding='utf-8', newline='') as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit-worker") as pool:
+        writer = csv.DictWriter(out, fieldnames=AUDIT_COLUMNS) if as_csv else None
+        if writer and new_file:
+            writer.writeheader()
+        if not new_file and torn:
+            out.write('\n')
+        
+        def record(row):
+            if row['error']:
+                counts['error'] += 1
+                print(f"❌ {row['input']}: {row['error']}")
+            else:
+                counts['audited'] += 1
+                counts['audio'] += any(l.lower().startswith(lang.lower()) for l in row['audio_langs'])
+                counts['subs'] += lang in row['manual_subs']
+                print(f"✅ {row['title']}: audio {','.join(row['audio_langs']) or '-'} | subs {','.join(row['manual_subs']) or '-'} | {row['best_height'] or '?'}p")
+            if writer:
+                writer.writerow({k: ';'.join(v) if isinstance(v, list) else v for k, v in row.items()})
+            else:
+                out.write(json.dumps(row, ensure_ascii=False) + '\n')
+            out.flush()
+        
+        def probe(item):
+            try:
+                return audit_languages(item, lang)
+            except Exception as e:
+                return dict(dict.fromkeys(AUDIT_COLUMNS), input=item, error=f"Unexpected error: {e}")
+        
+        pending = set()
+        try:
+            for item in items:
+                if item in seen:
+                    counts['skipped'] += 1
+                    continue
+                seen.add(item)  # Also drops duplicates within this run
+                if len(pending) >= workers * 2:  # Keep the input stream lazy (it may be thousands of lines)
+                    done = next(as_completed(pending))
+                    pending.remove(done)
+                    record(done.result())
+                pending.add(pool.submit(probe, item))
+        finally:
+            # Also on Ctrl+C: probes already running are saved, not redone on resume
+            for future in as_completed(pending):
+                record(future.result())
+    
+    print(f"\n🔍 Audit finished in {time.time() - started:.1f}s: {counts['audited']} probed, {counts['error']} failed, {counts['skipped']} already done")
+    if counts['audited']:
+        print(f"🌍 {lang}: audio in {counts['audio']}/{counts['audited']}, subtitles in {counts['subs']}/{counts['audited']}")
+    print_extraction_stats()
+    print_rate_limit_stats()
+    return counts
+
+def serve_jobs(host=SERVICE_HOST, port=SERVICE_PORT, lang='fr', mode='merged', verbose=False):
+    """
+    Long-running service: an asyncio HTTP API running process_movie's stages as jobs.
+
+        POST /jobs               {"movie_id": "155"} or {"movie_ids": [...]}, optional lang/mode/priority
+        GET  /jobs               all jobs (?status=queued|running|success|error)
+        GET  /jobs/<id>          one job: stage, match, download report, error
+        GET  /jobs/<id>/events   Server-Sent Events: stage changes and download progress until the job ends
+        GET  /metrics, /health
+
+    The blocking stages run on the same per-stage thread pools as batch
+    mode, so any number of jobs can be queued while the TMDB cache, the
+    extraction cache, the HTTP session and the rate limits stay warm and
+    shared. Submitting a movie that already has a queued or running job
+    returns that job instead of starting a second one.
+    """
+    import asyncio
+    import uuid
+    from urllib.parse import urlsplit, parse_qs
+    
+    jobs = OrderedDict()  # job ID -> job, oldest first
+    active_by_movie = {}  # movie ID -> job ID of its queued or running job
+    pools = {
+        'metadata': ThreadPoolExecutor(max_workers=METADATA_WORKERS, thread_name_prefix='metadata-worker'),
+        'search': ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='search-worker'),
+        'download': ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix='download-worker')
+    }
+    reasons = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+    
+    def public(job):
+        return {k: v for k, v in job.items() if not k.startswith('_')}
+    
+    def publish(job, event_type, **fields):
+        """Record a job event and hand it to the live /events subscribers (event loop thread only)"""
+        event = {'ts': round(time.time(), 3), 'type': event_type, **fields}
+        job['_events'].append(event)
+        del job['_events'][:-SERVICE_EVENTS_KEPT]
+        for subscriber in job['_subscribers']:
+            subscriber.put_nowait(event)
+    
+    def on_progress(movie_id, event):
+        """PROGRESS_LISTENERS callback, called from download threads"""
+        job_id = active_by_movie.get(str(movie_id))
+        if job_id:
+            loop.call_soon_threadsafe(lambda: job_id in jobs and publish(jobs[job_id], 'progress', **event))
+    
+    async def in_stage(stage, job, func, *args, **kwargs):
+        job.update(stage=stage, status='running')
+        job.setdefault('started_at', round(time.time(), 3))
+        publish(job, 'stage', stage=stage)
+        
+        def call():
+            set_trace_movie(job['movie_id'])
+            return func(*args, **kwargs)
+        return await loop.run_in_executor(pools[stage], call)
+    
+    async def run_job(job):
+        try:
+            movie_data = await in_stage('metadata', job, get_tmdb_movie_details, job['movie_id'])
+            if movie_data.get('status') == 'error':
+                return finish(job, 'error', movie_data.get('message'))
+            job.update(title=movie_data.get('title'), year=movie_data.get('year'))
+            
+            match = {}
+            url = await in_stage('search', job, search_youtube_full_movie, movie_data, job['lang'], report=match)
+            if not url:
+                return finish(job, 'error', 'No suitable video found')
+            job['match'] = match
+            
+            details = {}
+            outcome = await in_stage('download', job, download_youtube, url, job['lang'], job['mode'], verbose,
+                                     report=details, priority=job['priority'])
+            if details:
+                job['download'] = details
+            if isinstance(outcome, dict):  # check mode returns language availability
+                job['languages'] = outcome
+                outcome = 'error' not in outcome
+            finish(job, 'success' if outcome else 'error', None if outcome else 'Download failed')
+        except Exception as e:
+            finish(job, 'error', f"Unexpected error: {e}")
+    
+    def finish(job, status, message=None):
+        job.update(status=status, finished_at=round(time.time(), 3))
+        if message:
+            job['message'] = message
+        if active_by_movie.get(job['movie_id']) == job['id']:
+            del active_by_movie[job['movie_id']]
+        publish(job, 'finished', status=status, message=message)
+        
+        finished = [job_id for job_id, j in jobs.items() if j['status'] in ('success', 'error')]
+        for job_id in finished[:max(0, len(finished) - SERVICE_JOBS_KEPT)]:
+            del jobs[job_id]
+    
+    def submit(request):
+        movie_ids = request.get('movie_ids') or [request.get('movie_id')]
+        if not isinstance(movie_ids, list):
+            raise ValueError("movie_ids must be a list")
+        if not all(isinstance(movie_id, (str, int)) and not isinstance(movie_id, bool) and str(movie_id).strip() for movie_id in movie_ids):
+            raise ValueError("movie_id (or a movie_ids list) is required")
+        if request.get('mode', mode) not in ('merged', 'separate', 'both', 'remux', 'check'):
+            raise ValueError(f"unknown mode: {request['mode']}")
+        if request.get('priority', 'normal') not in PRIORITY_WEIGHTS:
+            raise ValueError(f"unknown priority: {request['priority']}")
+        
+        submitted = []
+        for movie_id in map(str, movie_ids):
+            movie_id = movie_id.strip()
+            if movie_id in active_by_movie:
+                submitted.append(jobs[active_by_movie[movie_id]])
+                continue
+            job = {
+                'id': uuid.uuid4().hex[:12],
+                'movie_id': movie_id,
+                'lang': request.get('lang', lang),
+                'mode': request.get('mode', mode),
+                'priority': request.get('priority', 'normal'),
+                'status': 'queued',
+                'stage': 'queued',
+                'created_at': round(time.time(), 3),
+                '_events': [],
+                '_subscribers': []
+            }
+            jobs[job['id']] = job
+            active_by_movie[movie_id] = job['id']
+            publish(job, 'queued')
+            job['_task'] = loop.create_task(run_job(job))  # Keep a reference: the loop only holds weak ones
+            submitted.append(job)
+        return submitted
+    
+    def respond(writer, status, body, content_type='application/json'):
+        if content_type == 'application/json':
+            body = json.dumps(body, ensure_ascii=False)
+        data = body.encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode('latin-1') + data
+        )
+    
+    async def stream_events(writer, job):
+        """Server-Sent Events: replay the recent events, then follow the job until it ends"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        subscriber = asyncio.Queue()
+        for event in job['_events']:
+            subscriber.put_nowait(event)
+        if job['status'] in ('queued', 'running'):
+            job['_subscribers'].append(subscriber)
+        try:
+            while True:
+                event = await subscriber.get()
+                writer.write(f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                await writer.drain()
+                if event['type'] == 'finished' or (subscriber.empty() and subscriber not in job['_subscribers']):
+                    return
+        finally:
+            if subscriber in job['_subscribers']:
+                job['_subscribers'].remove(subscriber)
+    
+    async def handle_client(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) != 3:
+                return respond(writer, 400, {'error': 'malformed request'})
+            method, target, _ = request_line
+            length = int(headers.get('content-length') or 0)
+            if length > SERVICE_MAX_BODY:
+                return respond(writer, 413, {'error': 'request body too large'})
+            body = await reader.readexactly(length) if length else b''
+            
+            url = urlsplit(target)
+            parts = [part for part in url.path.split('/') if part]
+            if parts == ['health']:
+                return respond(writer, 200, {'status': 'ok', 'jobs': len(jobs), 'active': len(active_by_movie)})
+            if parts == ['metrics']:
+                return respond(writer, 200, render_prometheus_metrics(), 'text/plain; version=0.0.4; charset=utf-8')
+            if parts == ['jobs'] and method == 'POST':
+                try:
+                    submitted = submit(json.loads(body or b'{}'))
+                except (ValueError, AttributeError) as e:  # json.JSONDecodeError is a ValueError
+                    return respond(writer, 400, {'error': str(e)})
+                return respond(writer, 202, {'jobs': [public(job) for job in submitted]})
+            if parts == ['jobs'] and method == 'GET':
+                status = parse_qs(url.query).get('status', [None])[0]
+                return respond(writer, 200, {'jobs': [public(job) for job in jobs.values() if status in (None, job['status'])]})
+            if len(parts) in (2, 3) and parts[0] == 'jobs' and parts[2:] in ([], ['events']):
+                job = jobs.get(parts[1])
+                if job is None:
+                    return respond(writer, 404, {'error': f"unknown job {parts[1]}"})
+                if method != 'GET':
+                    return respond(writer, 405, {'error': 'use GET'})
+                if parts[2:] == ['events']:
+                    return await stream_events(writer, job)
+                return respond(writer, 200, public(job))
+            respond(writer, 404, {'error': 'not found'})
+        except ValueError:
+            respond(writer, 400, {'error': 'invalid Content-Length'})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    async def main():
+        nonlocal loop
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(handle_client, host, port)
+        print(f"🛰️ Service listening on http://{host}:{port} (POST /jobs, GET /jobs/<id>, GET /jobs/<id>/events)")
+        async with server:
+            await server.serve_forever()
+    
+    loop = None
+    PROGRESS_LISTENERS.append(on_progress)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Service stopped")
+    finally:
+        PROGRESS_LISTENERS.remove(on_progress)
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="TMDB to YouTube Downloader Bot")
-    parser.add_argument("movie_id", help="TMDB movie ID")
+    parser.add_argument("movie_id", nargs='?', help="TMDB movie ID")
     parser.add_argument("--lang", default="fr", help="Preferred audio/subtitle language (default: fr)")
-    parser.add_argument("--mode", choices=['merged', 'separate', 'both', 'check'], default="merged", 
-                        help="Download mode: merged (video+audio together), separate (video and audio as separate files), both (try both methods), or check (just check language availability without downloading)")
+    parser.add_argument("--mode", choices=['merged', 'separate', 'both', 'remux', 'check'], default="merged", 
+                        help="Download mode: merged (video+audio together), separate (video and audio as separate files), both (try both methods), remux (separate files plus a merged file built locally from them), or check (just check language availability without downloading)")
     parser.add_argument("--verbose", "-v", action="store_true", help="Show verbose output")
+    parser.add_argument("--batch", metavar="FILE", help="Process many TMDB IDs from FILE (one per line, '-' for stdin)")
+    parser.add_argument("--metadata-workers", type=int, default=METADATA_WORKERS, help=f"Batch: concurrent TMDB lookups (default: {METADATA_WORKERS})")
+    parser.add_argument("--search-workers", type=int, default=SEARCH_WORKERS, help=f"Batch: concurrent YouTube searches (default: {SEARCH_WORKERS})")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS, help=f"Batch: concurrent downloads (default: {DOWNLOAD_WORKERS})")
+    parser.add_argument("--queue-size", type=int, default=STAGE_QUEUE_SIZE, help=f"Batch: max items queued between stages (default: {STAGE_QUEUE_SIZE})")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk TMDB cache (no reads, no writes)")
+    parser.add_argument("--purge-cache", action="store_true", help="Empty the TMDB cache before running (alone: purge and exit)")
+    parser.add_argument("--cache-ttl", type=int, default=TMDB_CACHE_TTL, help=f"Seconds before cached TMDB details are revalidated (default: {TMDB_CACHE_TTL})")
+    parser.add_argument("--cache-max-entries", type=int, default=TMDB_CACHE_MAX_ENTRIES, help=f"Max movies kept in the TMDB cache (default: {TMDB_CACHE_MAX_ENTRIES})")
+    parser.add_argument("--persist-extractions", action="store_true", help="Keep yt-dlp video info on disk so the next run can reuse it")
+    parser.add_argument("--extraction-ttl", type=int, default=EXTRACTION_CACHE_TTL, help=f"Seconds a cached video info is reused (default: {EXTRACTION_CACHE_TTL})")
+    parser.add_argument("--search-mode", choices=['two-phase', 'full'], default=SEARCH_MODE, help=f"two-phase: flat listing then verify the top-K; full: resolve every result (default: {SEARCH_MODE})")
+    parser.add_argument("--search-candidates", type=int, default=SEARCH_CANDIDATES, help=f"YouTube results to consider (default: {SEARCH_CANDIDATES})")
+    parser.add_argument("--search-top-k", type=int, default=SEARCH_TOP_K, help=f"Candidates fully extracted in two-phase mode (default: {SEARCH_TOP_K})")
+    parser.add_argument("--query-variants", default=",".join(SEARCH_QUERY_VARIANTS),
+                        help=f"Comma-separated search query variants run concurrently in two-phase mode (default: {','.join(SEARCH_QUERY_VARIANTS)})")
+    parser.add_argument("--high-confidence", type=float, default=SEARCH_HIGH_CONFIDENCE, help=f"Stop searching further variants once a candidate scores this high (default: {SEARCH_HIGH_CONFIDENCE})")
+    parser.add_argument("--compare-search", action="store_true", help="Time both search modes (wall time, peak memory) for the movie and exit")
+    parser.add_argument("--stream-workers", type=int, default=STREAM_WORKERS, help=f"Streams (video/audio/subtitles) downloaded in parallel in separate/both modes (default: {STREAM_WORKERS})")
+    parser.add_argument("--fragment-workers", type=int, default=FRAGMENT_WORKERS, help=f"Fragments fetched in parallel for DASH/HLS streams; 1 while --max-bandwidth is set (default: {FRAGMENT_WORKERS})")
+    parser.add_argument("--journal", nargs='?', const=os.path.join(CACHE_DIR, "journal.sqlite3"), metavar="PATH",
+                        help="Batch: record progress in a job journal so restarts skip finished movies and resume partial ones (default path: Youtube_Bot_Downloads/.cache/journal.sqlite3)")
+    parser.add_argument("--max-attempts", type=int, default=JOURNAL_MAX_ATTEMPTS, help=f"Batch with --journal: attempts per movie before giving up (default: {JOURNAL_MAX_ATTEMPTS})")
+    parser.add_argument("--tmdb-rate", type=float, default=RATE_LIMITS['tmdb']['rate'], help=f"Max TMDB requests per second (default: {RATE_LIMITS['tmdb']['rate']:g})")
+    parser.add_argument("--youtube-rate", type=float, default=RATE_LIMITS['youtube']['rate'], help=f"Max YouTube extractions/searches per second (default: {RATE_LIMITS['youtube']['rate']:g})")
+    parser.add_argument("--rate-limit-db", nargs='?', const=os.path.join(CACHE_DIR, "ratelimit.sqlite3"), metavar="PATH",
+                        help="Share rate limits with other processes through this SQLite file (default path: Youtube_Bot_Downloads/.cache/ratelimit.sqlite3)")
+    parser.add_argument("--no-decision-cache", action="store_true", help="Always search YouTube, ignoring matches decided on earlier runs")
+    parser.add_argument("--decision-threshold", type=float, default=DECISION_MIN_SCORE, help=f"Min match score for a decision to be cached and reused (default: {DECISION_MIN_SCORE})")
+    parser.add_argument("--export-decisions", metavar="FILE", help="Write cached match decisions to a JSONL file")
+    parser.add_argument("--import-decisions", metavar="FILE", help="Merge match decisions from a JSONL export (newest wins)")
+    parser.add_argument("--max-bandwidth", metavar="RATE", help="Total download speed shared by all running downloads, e.g. 8M or 500K bytes/s (default: unlimited)")
+    parser.add_argument("--priority", choices=sorted(PRIORITY_WEIGHTS, key=PRIORITY_WEIGHTS.get, reverse=True), default='normal', help="Priority class of this run's downloads: bandwidth share and admission order (default: normal)")
+    parser.add_argument("--disk-headroom", default=f"{DISK_HEADROOM // 1024 ** 3}G", metavar="SIZE", help=f"Free space always kept on the download disk; downloads wait or are refused below it (default: {DISK_HEADROOM // 1024 ** 3}G)")
+    parser.add_argument("--no-store", action="store_true", help="Download into the movie folder without using the content-addressed store")
+    parser.add_argument("--verify-store", action="store_true", help="Check the size and SHA-256 of every stored stream and drop damaged ones (alone: verify and exit)")
+    parser.add_argument("--gc-store", action="store_true", help="Delete stored streams no movie folder links to any more (alone: collect and exit)")
+    parser.add_argument("--trace-file", metavar="FILE", help="Append one JSONL timing event per stage (TMDB, search, extraction, download) to FILE")
+    parser.add_argument("--metrics-file", metavar="FILE", help="Write Prometheus text-format metrics to FILE at the end of the run")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="Serve Prometheus metrics on http://HOST:PORT/metrics while running (see --host)")
+    parser.add_argument("--profile", metavar="FILE", help="Run under cProfile and write the stats to FILE")
+    parser.add_argument("--audit", metavar="FILE", help="Audit audio/subtitle languages of many YouTube URLs or TMDB IDs from FILE ('-' for stdin) without downloading")
+    parser.add_argument("--audit-output", default=AUDIT_OUTPUT_FILE, help=f"Audit: JSONL or .csv table, appended to and resumed from (default: {AUDIT_OUTPUT_FILE})")
+    parser.add_argument("--audit-workers", type=int, default=AUDIT_WORKERS, help=f"Audit: concurrent probes (default: {AUDIT_WORKERS})")
+    parser.add_argument("--serve", nargs='?', type=int, const=SERVICE_PORT, metavar="PORT", help=f"Run as a long-lived HTTP job service (default port: {SERVICE_PORT}); --lang/--mode are the job defaults")
+    parser.add_argument("--host", default=SERVICE_HOST, help=f"Service and --metrics-port: address to listen on (default: {SERVICE_HOST})")
+    parser.add_argument("--ingest", choices=['discover', 'list', 'changes'], help="Batch-process movies paged from TMDB discover, a TMDB list (--list-id) or the daily changes feed")
+    parser.add_argument("--list-id", help="Ingest: TMDB list ID for --ingest list")
+    parser.add_argument("--year", type=int, help="Ingest: only movies released this year")
+    parser.add_argument("--genre", help="Ingest: only movies in any of these comma-separated genres (names or TMDB IDs)")
+    parser.add_argument("--min-runtime", type=int, metavar="MINUTES", help="Ingest: only movies at least this long")
+    parser.add_argument("--max-runtime", type=int, metavar="MINUTES", help="Ingest: only movies at most this long")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="Ingest changes: first day to sync when no earlier sync was checkpointed (default: yesterday)")
+    parser.add_argument("--max-movies", type=int, metavar="N", help="Ingest: stop after handing N movies to the pipeline")
+    parser.add_argument("--reset-cursor", action="store_true", help="Ingest: forget the checkpoint of this source/filters and start over")
+    parser.add_argument("--results", default=BATCH_RESULTS_FILE, help=f"Batch: JSONL file receiving one result per movie (default: {BATCH_RESULTS_FILE})")
     
     args = parser.parse_args()
+    standalone = args.purge_cache or args.export_decisions or args.import_decisions or args.verify_store or args.gc_store
+    if not args.movie_id and not args.batch and not args.audit and not args.ingest and args.serve is None and not standalone:
+        parser.error("a TMDB movie ID, --batch FILE, --ingest SOURCE, --audit FILE or --serve is required")
+    if args.ingest == 'list' and not args.list_id:
+        parser.error("--ingest list needs --list-id")
+    if args.since and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', args.since):
+        parser.error("--since must be a YYYY-MM-DD date")
+    if args.max_movies is not None and args.max_movies < 1:
+        parser.error("--max-movies must be at least 1")
+    if min(args.metadata_workers, args.search_workers, args.download_workers, args.queue_size, args.audit_workers) < 1:
+        parser.error("worker counts and --queue-size must be at least 1")
+    if min(args.search_candidates, args.search_top_k) < 1:
+        parser.error("--search-candidates and --search-top-k must be at least 1")
+    unknown_variants = set(args.query_variants.split(',')) - {'title_year', 'original_year', 'title_director', 'localized', ''}
+    if unknown_variants:
+        parser.error(f"unknown --query-variants: {', '.join(sorted(unknown_variants))}")
+    if min(args.stream_workers, args.fragment_workers) < 1:
+        parser.error("--stream-workers and --fragment-workers must be at least 1")
+    if min(args.tmdb_rate, args.youtube_rate) <= 0:
+        parser.error("--tmdb-rate and --youtube-rate must be positive")
+    try:
+        BANDWIDTH_LIMIT = parse_byte_size(args.max_bandwidth) if args.max_bandwidth else None
+        DISK_HEADROOM = parse_byte_size(args.disk_headroom)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.compare_search and not args.movie_id:
+        parser.error("--compare-search needs a TMDB movie ID")
+    
+    TMDB_CACHE_ENABLED = not args.no_cache
+    TMDB_CACHE_TTL = args.cache_ttl
+    TMDB_CACHE_MAX_ENTRIES = args.cache_max_entries
+    EXTRACTION_CACHE_PERSIST = args.persist_extractions
+    EXTRACTION_CACHE_TTL = args.extraction_ttl
+    SEARCH_MODE = args.search_mode
+    SEARCH_CANDIDATES = args.search_candidates
+    SEARCH_TOP_K = args.search_top_k
+    SEARCH_QUERY_VARIANTS = tuple(v.strip() for v in args.query_variants.split(',') if v.strip())
+    SEARCH_HIGH_CONFIDENCE = args.high_confidence
+    RATE_LIMITS['tmdb']['rate'] = args.tmdb_rate
+    RATE_LIMITS['youtube']['rate'] = args.youtube_rate
+    RATE_LIMIT_FILE = args.rate_limit_db
+    JOURNAL_FILE = args.journal
+    JOURNAL_MAX_ATTEMPTS = args.max_attempts
+    STREAM_WORKERS = args.stream_workers
+    FRAGMENT_WORKERS = args.fragment_workers
+    DECISION_CACHE_ENABLED = not args.no_decision_cache
+    DECISION_MIN_SCORE = args.decision_threshold
+    STORE_ENABLED = not args.no_store
+    if args.purge_cache:
+        print(f"🧹 Purged {purge_tmdb_cache()} cached TMDB entries")
+    if args.import_decisions:
+        print(f"📥 Imported {import_match_decisions(args.import_decisions)} match decision(s)")
+    if args.export_decisions:
+        print(f"📤 Exported {export_match_decisions(args.export_decisions)} match decision(s) to {args.export_decisions}")
+    if args.verify_store:
+        counts = verify_store()
+        print(f"🔎 Store verified: {counts['ok']}/{counts['blobs']} stream(s) intact, {counts['missing']} missing, {counts['damaged']} damaged, {counts['links_removed']} movie file(s) removed")
+    if args.gc_store:
+        deleted, freed = gc_store()
+        print(f"🧹 Store garbage collected: {deleted} file(s) deleted, {freed / 1024 ** 2:.1f} MiB freed")
+    if standalone and not args.movie_id and not args.batch and not args.audit and not args.ingest and args.serve is None:
+        sys.exit(0)
+    
+    TRACE_FILE = args.trace_file
+    METRICS_FILE = args.metrics_file
+    if METRICS_FILE:
+        atexit.register(write_metrics_file, METRICS_FILE)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port, args.host)
+    if args.profile:
+        atexit.register(save_profile, start_profiling(), args.profile)
+    
+    if args.audit:
+        # URL-only audits do not need TMDB; TMDB IDs without a key just fail their rows
+        counts = run_language_audit(read_movie_ids(args.audit), args.lang, args.audit_output, args.audit_workers)
+        sys.exit(0 if counts['error'] == 0 else 1)
     
     if not TMDB_API_KEY or TMDB_API_KEY == 'your_tmdb_api_key':
         print("❌ Error: You need to set your TMDB API key in the script")
         sys.exit(1)
     
-    success = process_movie(args.movie_id, args.lang, args.mode, args.verbose)
+    if args.compare_search:
+        movie_data = get_tmdb_movie_details(args.movie_id)
+        if movie_data.get('status') == 'error':
+            sys.exit(1)
+        compare_search_modes(movie_data, args.lang)
+        sys.exit(0)
+    
+    if args.serve is not None:
+        METADATA_WORKERS = args.metadata_workers
+        SEARCH_WORKERS = args.search_workers
+        DOWNLOAD_WORKERS = args.download_workers
+        serve_jobs(args.host, args.serve, args.lang, args.mode, args.verbose)
+        sys.exit(0)
+    
+    if args.batch or args.ingest:
+        if args.ingest:
+            filters = {
+                'year': args.year,
+                'genres': [g.strip() for g in args.genre.split(',') if g.strip()] if args.genre else None,
+                'min_runtime': args.min_runtime,
+                'max_runtime': args.max_runtime
+            }
+            cursor = catalogue_cursor_name(args.ingest, filters, args.list_id)
+            if args.reset_cursor:
+                reset_catalogue_cursor(cursor)
+            items = iter_tmdb_catalogue(args.ingest, filters, args.list_id, args.since)
+            if args.max_movies:
+                items = itertools.islice(items, args.max_movies)
+            on_result = lambda summary: catalogue_finished(cursor, summary['movie_id'])
+        else:
+            items = read_movie_ids(args.batch)
+            on_result = None
+        counts = run_batch(
+            items, args.lang, args.mode, args.verbose,
+            metadata_workers=args.metadata_workers,
+            search_workers=args.search_workers,
+            download_workers=args.download_workers,
+            queue_size=args.queue_size,
+            results_file=args.results,
+            priority=args.priority,
+            on_result=on_result
+        )
+        sys.exit(0 if counts['error'] == 0 else 1)
+    
+    success = process_movie(args.movie_id, args.lang, args.mode, args.verbose, args.priority)
     sys.exit(0 if success else 1)
\ No newline at end of file